@@ -1,9 +1,15 @@
+import fnmatch
+
+import json
+
 import math
 
 import os
 
 from GraphModel import Graph
 
+import numpy as np
+
 import pandas as pd
 
 import matplotlib.pyplot as plt
@@ -11,113 +17,218 @@ import matplotlib.pyplot as plt
 pd.set_option('display.max_colwidth', None)
 pd.set_option('display.width', 1000)
 
-# Read .dat file to create graph
-def read_dat_to_graph(filename):
+CACHE_FOLDER = os.path.join("selected_instances", "__cache__")
+CACHE_VERSION = 3
+
+# Section header -> (key in the parsed arrays, row prefix, numeric columns)
+DAT_SECTIONS = {
+    "ReN.": ("ReN", "N", 3),
+    "ReE.": ("ReE", "E", 5),
+    "ReA.": ("ReA", "A", 5),
+    "EDGE": ("EDGE", "NrE", 3),
+    "ARC": ("ARC", "NrA", 3),
+}
+
+HEADER_FIELDS = ("Capacity:", "Depot Node:", "#Nodes:", "Optimal value:")
+
+# Read .dat file to create graph, using the binary cache when it is up to date
+def read_dat_to_graph(filename, use_cache=True):
     filepath = os.path.join("selected_instances", filename)
 
-    graph = Graph()
+    arrays = load_cached_instance(filepath) if use_cache else None
+    if arrays is None:
+        arrays = parse_dat_file(filepath)
+        if use_cache:
+            save_cached_instance(filepath, arrays)
 
+    return build_graph_from_arrays(arrays)
+
+# Single pass over the file: header values are read directly and each
+# section's rows are converted to an int array in one block
+def parse_dat_file(filepath):
     with open(filepath, 'r') as file:
-        lines = file.readlines()
+        lines = file.read().splitlines()
+
+    header = dict.fromkeys(HEADER_FIELDS, -1)
+    arrays = {}
+    i = 0
+
+    while i < len(lines):
+        line = lines[i].strip()
+        i += 1
+
+        field = next((f for f in HEADER_FIELDS if line.startswith(f)), None)
+        if field is not None:
+            header[field] = int(line.split()[-1])
+            continue
+
+        section = next((s for s in DAT_SECTIONS if line.startswith(s)), None)
+        if section is None:
+            continue
+
+        key, prefix, columns = DAT_SECTIONS[section]
+        rows = []
+        while i < len(lines) and lines[i].startswith(prefix):
+            rows.append(lines[i])
+            i += 1
+
+        arrays[key] = parse_section_rows(rows, prefix, columns)
+
+    for key, _, columns in DAT_SECTIONS.values():
+        arrays.setdefault(key, np.empty((0, columns), dtype=np.int64))
+
+    arrays["header"] = np.array([header[f] for f in HEADER_FIELDS], dtype=np.int64)
+    return arrays
+
+def parse_section_rows(rows, prefix, columns):
+    if not rows:
+        return np.empty((0, columns), dtype=np.int64)
+
+    # Required node rows carry the id in the label ("N4"), the others start with a label to skip
+    if prefix == "N":
+        return np.loadtxt([row[1:] for row in rows], dtype=np.int64, ndmin=2)
+    return np.loadtxt(rows, dtype=np.int64, usecols=range(1, columns + 1), ndmin=2)
+
+def build_graph_from_arrays(arrays):
+    graph = Graph()
+    capacity, depot, total_nodes, optimal_value = arrays["header"].tolist()
 
-    section = None
     input_data = {
         "ReN": [],
         "ReE": [],
         "ReA": []
     }
 
-    for line in lines:
-        line = line.strip()
+    if capacity != -1:
+        graph.set_capacity(capacity)
+    if depot != -1:
+        graph.set_depot(depot)
+    if optimal_value != -1:
+        graph.set_optimal_value(optimal_value)
+    for v in range(1, total_nodes + 1):
+        graph.add_node(v)
+
+    for node_id, demand, service_cost in arrays["ReN"].tolist():
+        graph.mark_required_node(node_id, demand, service_cost)
+        input_data["ReN"].append({
+            "ReN.": f"N{node_id}",
+            "DEMAND": demand,
+            "S. COST": service_cost
+        })
+
+    for from_n, to_n, t_cost, demand, s_cost in arrays["ReE"].tolist():
+        graph.add_connection(from_n, to_n, t_cost, demand, connection_type="E", required=True, service_cost=s_cost)
+        input_data["ReE"].append({
+            "From N.": from_n,
+            "To N.": to_n,
+            "T. COST": t_cost,
+            "DEMAND": demand,
+            "S. COST": s_cost
+        })
+
+    for from_n, to_n, t_cost, demand, s_cost in arrays["ReA"].tolist():
+        graph.add_connection(from_n, to_n, t_cost, demand, connection_type="A", required=True, service_cost=s_cost)
+        input_data["ReA"].append({
+            "FROM N.": from_n,
+            "TO N.": to_n,
+            "T. COST": t_cost,
+            "DEMAND": demand,
+            "S. COST": s_cost
+        })
+
+    # Non-required links are traversable but never serviced
+    for from_n, to_n, t_cost in arrays["EDGE"].tolist():
+        graph.add_connection(from_n, to_n, t_cost, 0, connection_type="E", required=False)
+
+    for from_n, to_n, t_cost in arrays["ARC"].tolist():
+        graph.add_connection(from_n, to_n, t_cost, 0, connection_type="A", required=False)
 
-        if not line or line.startswith("Name") or line.startswith("Optimal value") or line.startswith("#Vehicles"):
-            continue
-
-        if line.startswith("Capacity:"):
-            graph.set_capacity(int(line.split()[-1]))
-        elif line.startswith("Depot Node:"):
-            graph.set_depot(int(line.split()[-1]))
-        elif line.startswith("#Nodes:"):
-            total_nodes = int(line.split()[-1])
-            for v in range(1, total_nodes + 1):
-                graph.add_node(v)
-        elif line.startswith("ReN."):
-            section = "REN"
-            continue
-        elif line.startswith("ReE."):
-            section = "REE"
-            continue
-        elif line.startswith("EDGE"):
-            section = None
-            continue
-        elif line.startswith("ReA."):
-            section = "REA"
-            continue
-        elif line.startswith("ARC"):
-            section = None
-            continue
+    return graph, input_data
 
-        if section == "REN":
-            parts = line.split()
-            if parts[0].startswith("N"):
-                node_id = int(parts[0][1:])
-                demand = int(parts[1])
-                service_cost = int(parts[2])
-                graph.mark_required_node(node_id)
-                input_data["ReN"].append({
-                    "ReN.": f"N{node_id}",
-                    "DEMAND": demand,
-                    "S. COST": service_cost
-                })
-
-        # Parse required edges
-        elif section == "REE":
-            parts = line.split()
-            if parts[0].startswith("E"):
-                from_n = int(parts[1])
-                to_n = int(parts[2])
-                t_cost = int(parts[3])
-                demand = int(parts[4])
-                s_cost = int(parts[5])
-                graph.add_connection(from_n, to_n, t_cost, demand, connection_type="E", required=True)
-                input_data["ReE"].append({
-                    "From N.": from_n,
-                    "To N.": to_n,
-                    "T. COST": t_cost,
-                    "DEMAND": demand,
-                    "S. COST": s_cost
-                })
-
-        # Parse required arcs
-        elif section == "REA":
-            parts = line.split()
-            if parts[0].startswith("A"):
-                from_n = int(parts[1])
-                to_n = int(parts[2])
-                t_cost = int(parts[3])
-                demand = int(parts[4])
-                s_cost = int(parts[5])
-                graph.add_connection(from_n, to_n, t_cost, demand, connection_type="A", required=True)
-                input_data["ReA"].append({
-                    "FROM N.": from_n,
-                    "TO N.": to_n,
-                    "T. COST": t_cost,
-                    "DEMAND": demand,
-                    "S. COST": s_cost
-                })
+# Cache file is keyed by the source file's mtime and size plus the cache format version
+def get_cache_key(filepath):
+    stat = os.stat(filepath)
+    return np.array([CACHE_VERSION, stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+
+def get_cache_path(filepath):
+    name = os.path.splitext(os.path.basename(filepath))[0]
+    return os.path.join(CACHE_FOLDER, f"{name}.npy")
+
+# The cache is a single flat int64 array, which loads much faster than an .npz archive:
+# key (3) | header (3) | row count per section | rows of each section, flattened
+def load_cached_instance(filepath):
+    cache_path = get_cache_path(filepath)
+    if not os.path.exists(cache_path):
+        return None
+
+    try:
+        data = np.load(cache_path)
+    except (OSError, ValueError):
+        return None
+
+    key = get_cache_key(filepath)
+    if len(data) < len(key) or not np.array_equal(data[:len(key)], key):
+        return None
+
+    position = len(key)
+    arrays = {"header": data[position:position + len(HEADER_FIELDS)]}
+    position += len(HEADER_FIELDS)
+
+    counts = data[position:position + len(DAT_SECTIONS)].tolist()
+    position += len(DAT_SECTIONS)
+
+    for count, (key_name, _, columns) in zip(counts, DAT_SECTIONS.values()):
+        arrays[key_name] = data[position:position + count * columns].reshape(count, columns)
+        position += count * columns
+
+    return arrays
+
+def save_cached_instance(filepath, arrays):
+    cache_path = get_cache_path(filepath)
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+
+    sections = [arrays[key_name] for key_name, _, _ in DAT_SECTIONS.values()]
+    data = np.concatenate([
+        get_cache_key(filepath),
+        arrays["header"],
+        np.array([len(rows) for rows in sections], dtype=np.int64),
+        *[rows.ravel() for rows in sections],
+    ])
+
+    try:
+        os.makedirs(CACHE_FOLDER, exist_ok=True)
+        with open(temp_path, "wb") as file:
+            np.save(file, data)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+INSTANCE_FAMILIES = ("BHW", "CBMix", "DI-NEARP", "mggdb", "mgval")
+
+# List instance files matching a glob and/or families, ordered by name or file size
+# order: None (name), "smallest_first" or "largest_first"
+def list_dat_files(pattern="*.dat", families=None, order=None):
+    folder = "selected_instances"
+    filenames = sorted(
+        name for name in os.listdir(folder)
+        if name.endswith(".dat") and fnmatch.fnmatch(name, pattern)
+        and (not families or name.startswith(tuple(families)))
+    )
 
-    return graph, input_data
+    if order is not None:
+        filenames.sort(key=lambda name: os.path.getsize(os.path.join(folder, name)), reverse=order == "largest_first")
 
-def read_all_dat_files_to_graphs():
-    results = []
+    return filenames
 
-    folder = "selected_instances"
-    for filepath in os.listdir(folder):
-        if filepath.endswith(".dat"):
-            graph, input_data = read_dat_to_graph(filepath)
-            results.append((graph, input_data, filepath))
+# Parse instances lazily, keeping only one of them in memory at a time
+def iter_dat_files_to_graphs(pattern="*.dat", families=None, order=None):
+    for filepath in list_dat_files(pattern, families, order):
+        graph, input_data = read_dat_to_graph(filepath)
+        yield graph, input_data, filepath
 
-    return results
+def read_all_dat_files_to_graphs(pattern="*.dat", families=None, order=None):
+    return list(iter_dat_files_to_graphs(pattern, families, order))
 
 
 # Plot Graph
@@ -177,20 +288,21 @@ def draw_graph(graph):
 
 # Create table of statistics
 def graph_stats_table(graph):
+    all_stats = graph.compute_all_stats()
     stats = {
-        "Total de vértices": graph.get_total_of_vertexes(),
-        "Total de arestas": graph.get_total_of_edges(),
-        "Total de arcos": graph.get_total_of_arcs(),
-        "Vértices requeridos": graph.get_quantity_of_required_vertexes(),
-        "Arestas requeridas": graph.get_quantity_of_required_edges(),
-        "Arcos requeridos": graph.get_quantity_of_required_arcs(),
-        "Order strength": graph.get_order_strength(),
-        "Componentes conectados": [graph.get_list_of_connected_components()],
-        "Grau mínimo": graph.get_vertex_min_degree(),
-        "Grau máximo": graph.get_vertex_max_degree(),
-        "Centralidade de intermediação": [graph.betweenness_centrality()],
-        "Caminho médio": graph.get_average_path_length(),
-        "Diâmetro do grafo": graph.get_diameter()
+        "Total de vértices": all_stats["total_of_vertexes"],
+        "Total de arestas": all_stats["total_of_edges"],
+        "Total de arcos": all_stats["total_of_arcs"],
+        "Vértices requeridos": all_stats["required_vertexes"],
+        "Arestas requeridas": all_stats["required_edges"],
+        "Arcos requeridos": all_stats["required_arcs"],
+        "Order strength": all_stats["order_strength"],
+        "Componentes conectados": [all_stats["connected_components"]],
+        "Grau mínimo": all_stats["min_degree"],
+        "Grau máximo": all_stats["max_degree"],
+        "Centralidade de intermediação": [all_stats["betweenness_centrality"]],
+        "Caminho médio": all_stats["average_path_length"],
+        "Diâmetro do grafo": all_stats["diameter"]
     }
 
     df = pd.DataFrame.from_dict(stats, orient='index', columns=['Valor'])
@@ -218,60 +330,55 @@ def build_service_mapping(input_data):
     return mapping
 
 
-def export_solution_to_dat(input_name, routes, service_mapping, total_cost, clocks_alg_ref, clocks_sol_ref, graph):
-    os.makedirs("solutions", exist_ok=True)
-    output_path = os.path.join("solutions", f"sol-{input_name}")
-
-    with open(output_path, "w") as f:
-        f.write(f"{total_cost}\n")
-        f.write(f"{len(routes)}\n")
-        f.write(f"{clocks_alg_ref}\n")
-        f.write(f"{clocks_sol_ref}\n")
+SOLUTIONS_FOLDER = "solutions"
 
-        for route_id, route in enumerate(routes, start=1):
-            demand = 0
-            cost = 0
-            visit_count = 0
 
-            triplets = []
-            triplets.append("(D 0,1,1)")
-            visit_count += 1
+def get_solution_filename(input_name):
+    return f"sol-{input_name}"
 
-            for i in range(1, len(route)):
-                u = route[i - 1]
-                v = route[i]
-                cost += next((c.traversal_cost for c in graph.adj_list[u].connections if c.destiny == v), 0)
 
-                if ('N', v) in service_mapping:
-                    sid = service_mapping[('N', v)]
-                    triplets.append(f"(S {sid},{v},{v})")
-                    demand += 1
-                    visit_count += 1
+# Whole solution file built in memory from the routes' (RouteModel.Route) running totals
+def format_solution(routes, total_cost, clocks_alg_ref, clocks_sol_ref):
+    lines = [f"{total_cost}", f"{len(routes)}", f"{clocks_alg_ref}", f"{clocks_sol_ref}"]
 
-                edge_key = frozenset({u, v})
-                if ('E', edge_key) in service_mapping:
-                    sid = service_mapping[('E', edge_key)]
-                    triplets.append(f"(S {sid},{u},{v})")
-                    demand += 1
-                    visit_count += 1
+    for route_id, route in enumerate(routes, start=1):
+        triplets = ["(D 0,1,1)"]
+        triplets.extend(f"(S {service.service_id},{entry},{exit})" for service, entry, exit in route.visits)
+        triplets.append("(D 0,1,1)")
 
-                arc_key = (u, v)
-                if ('A', arc_key) in service_mapping:
-                    sid = service_mapping[('A', arc_key)]
-                    triplets.append(f"(S {sid},{u},{v})")
-                    demand += 1
-                    visit_count += 1
+        lines.append(f" 0 1 {route_id} {route.load} {route.get_total_cost()}  {len(triplets)} {' '.join(triplets)}")
 
-            triplets.append("(D 0,1,1)")
-            visit_count += 1
+    return "\n".join(lines) + "\n"
 
-            f.write(f" 0 1 {route_id} {demand} {cost}  {visit_count} {' '.join(triplets)}\n")
 
+# Writes to a temp file next to the target and renames it over the target, so an
+# interrupted run never leaves a half-written file behind
+def write_file_atomically(output_path, content):
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
 
+    try:
+        with open(temp_path, "w") as file:
+            file.write(content)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
 
 
+def export_solution_to_dat(input_name, routes, total_cost, clocks_alg_ref, clocks_sol_ref, output_folder=SOLUTIONS_FOLDER):
+    os.makedirs(output_folder, exist_ok=True)
+    output_path = os.path.join(output_folder, get_solution_filename(input_name))
 
+    write_file_atomically(output_path, format_solution(routes, total_cost, clocks_alg_ref, clocks_sol_ref))
 
+    return output_path
 
 
+# Single JSON Lines file with one {"instance", "solution" (the .dat content)} record per instance
+def write_combined_solutions(records, output_path):
+    folder = os.path.dirname(output_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
 
+    lines = [json.dumps({"instance": record["instance"], "solution": record["solution"]}) for record in records]
+    write_file_atomically(output_path, "".join(f"{line}\n" for line in lines))
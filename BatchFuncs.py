@@ -0,0 +1,183 @@
+"""
+Batch solving of instance files over a process pool.
+
+Each worker parses, solves and exports one instance and sends back only a summary:
+    {
+        "instance": String,
+        "status": "ok" | "timeout" | "error",
+        "routes": Int,
+        "total_cost": Int,
+        "clocks_used": Int,
+        "total_clocks": Int,
+        "lower_bound": Optional[Int], "gap": Optional[Float] (to the lower bound, with report_bound),
+        "optimal_value": Optional[Int] (as given in the instance header, with report_bound; not
+            on this objective for every instance, so no gap is computed against it),
+        "instrumentation": Optional[String] (report path),
+        "solution": Optional[String] (solution file content, with keep_solution),
+        "error": Optional[String]
+    }
+"""
+import os
+import signal
+
+from contextlib import nullcontext
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+
+from BoundFuncs import compute_lower_bound, get_gap
+
+from AuxFuncs import read_dat_to_graph, export_solution_to_dat, format_solution, list_dat_files, SOLUTIONS_FOLDER
+
+from ImprovementFuncs import local_search_algorithm_from_graph
+
+from InstrumentationFuncs import Instrumentation, write_instrumentation_report, DEFAULT_INSTRUMENTATION_FOLDER
+
+from MetaheuristicFuncs import alns_algorithm_from_graph
+
+from MultiStartFuncs import multi_start_algorithm_from_graph
+
+from SolutionFuncs import SOLVERS
+
+
+# Runs the chosen solver, followed by ALNS when metaheuristic is "alns", or by local
+# search when a strategy ("first"/"best") is given. With starts > 1 the randomized
+# constructive is run that many times over start_workers processes instead.
+# on_improvement is only used by ALNS
+def solve_graph(graph, solver="constructive", local_search=None, time_limit=None, metaheuristic=None, seed=None,
+                on_improvement=None, starts=1, start_workers=1, max_iterations=None):
+    if starts > 1:
+        return multi_start_algorithm_from_graph(graph, starts, start_workers, seed)
+    if metaheuristic == "alns":
+        return alns_algorithm_from_graph(graph, solver, time_limit, seed, on_improvement, max_iterations)
+    if local_search is None:
+        return SOLVERS[solver](graph)
+    return local_search_algorithm_from_graph(graph, solver, time_limit, local_search)
+
+
+# Builds the shortest-path tables that solve_graph will read for these options, so they
+# can be timed apart from the search: the distance matrix for multi-start, the
+# per-source paths for split and the improvement phases, none for the plain constructive
+def preprocess_graph(graph, solver="constructive", local_search=None, metaheuristic=None, starts=1, **_):
+    if starts > 1:
+        graph.get_distance_matrix()
+    elif solver != "constructive" or local_search is not None or metaheuristic is not None:
+        graph.get_shortest_paths()
+
+
+# Anytime export: every new incumbent is written right away with the clocks spent so far
+def make_incumbent_exporter(filename, start_total, output_folder=SOLUTIONS_FOLDER):
+    def export_incumbent(routes, total_cost, clocks_to_best):
+        total_clocks = int((perf_counter() - start_total) * 1e6)
+        export_solution_to_dat(filename, routes, total_cost, total_clocks, clocks_to_best, output_folder)
+    return export_incumbent
+
+
+# instrumentation: None, or {"profile": Bool, "trace_memory": Bool, "folder": String} to write a report
+def get_instrumentation_context(filename, instrumentation):
+    if instrumentation is None:
+        return nullcontext()
+    return Instrumentation(filename, instrumentation.get("profile", False), instrumentation.get("trace_memory", False))
+
+
+def save_instrumentation_report(instrument, instrumentation):
+    return write_instrumentation_report(instrument.report(), instrumentation.get("folder", DEFAULT_INSTRUMENTATION_FOLDER))
+
+
+# output_folder=None skips the solution files (and the anytime export); keep_solution
+# returns the file content in the summary instead, for a combined output. report_bound adds
+# the lower bound, its gap and the header optimum, computed after the clocks stop. on_solved() is called once the
+# solution is exported, before the bound (the batch runner stops the timeout there)
+def solve_instance(filename, instrumentation=None, output_folder=SOLUTIONS_FOLDER, keep_solution=False, report_bound=True,
+                   on_solved=None, **solver_options):
+    with get_instrumentation_context(filename, instrumentation) as instrument:
+        start_total = perf_counter()
+
+        graph, _ = read_dat_to_graph(filename)
+
+        on_improvement = make_incumbent_exporter(filename, start_total, output_folder) if output_folder is not None else None
+        routes, total_cost, clocks_used = solve_graph(graph, on_improvement=on_improvement, **solver_options)
+
+        total_clocks = int((perf_counter() - start_total) * 1e6)
+
+        if output_folder is not None:
+            export_solution_to_dat(filename, routes, total_cost, total_clocks, clocks_used, output_folder)
+
+    if on_solved is not None:
+        on_solved()
+
+    summary = {
+        "instance": filename,
+        "status": "ok",
+        "routes": len(routes),
+        "total_cost": total_cost,
+        "clocks_used": clocks_used,
+        "total_clocks": total_clocks,
+    }
+    if report_bound:
+        bound = compute_lower_bound(graph)
+        summary.update({
+            "lower_bound": bound["lower_bound"],
+            "gap": get_gap(total_cost, bound["lower_bound"]),
+            "optimal_value": bound["optimal_value"],
+        })
+    if keep_solution:
+        summary["solution"] = format_solution(routes, total_cost, total_clocks, clocks_used)
+    if instrument is not None:
+        summary["instrumentation"] = save_instrumentation_report(instrument, instrumentation)
+
+    return summary
+
+
+# Raised by the per-instance alarm. Not a TimeoutError, which subclasses OSError and
+# would be swallowed by the OSError handlers around the parse cache
+class InstanceTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise InstanceTimeout
+
+
+def _stop_timeout():
+    signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+# Runs inside the worker; the timeout relies on SIGALRM, so it is ignored where that is unavailable (Windows).
+# It covers parsing, solving and exporting only, not the lower bound reported afterwards
+def _solve_instance_with_timeout(filename, timeout, solver_options):
+    use_alarm = timeout is not None and hasattr(signal, "setitimer")
+
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    try:
+        return solve_instance(filename, on_solved=_stop_timeout if use_alarm else None, **solver_options)
+    except InstanceTimeout:
+        return {"instance": filename, "status": "timeout"}
+    except Exception as error:
+        return {"instance": filename, "status": "error", "error": repr(error)}
+    finally:
+        if use_alarm:
+            _stop_timeout()
+            signal.signal(signal.SIGALRM, previous_handler)
+
+
+# Runs function(*args) for every job over a process pool (workers defaults to the CPU
+# count) and yields the results as soon as they finish, in completion order
+def run_in_pool(function, jobs, workers=None, max_tasks_per_child=None):
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), max_tasks_per_child=max_tasks_per_child) as executor:
+        futures = [executor.submit(function, *args) for args in jobs]
+
+        for future in as_completed(futures):
+            yield future.result()
+
+
+# Yields one summary per instance as soon as it finishes
+def run_batch(filenames=None, workers=None, timeout=None, **solver_options):
+    if filenames is None:
+        filenames = list_dat_files(order="largest_first")
+
+    jobs = [(filename, timeout, solver_options) for filename in filenames]
+    yield from run_in_pool(_solve_instance_with_timeout, jobs, workers)
@@ -0,0 +1,190 @@
+"""
+Benchmark of solver configurations over instance files.
+
+Every (instance, configuration) pair runs in a fresh worker process, so peak RSS is
+the peak of that run alone. A run parses the instance, builds the shortest-path tables
+its solver reads (preprocessing, see preprocess_graph) and solves, warmup times untimed
+and then repeats times timed.
+One result row per pair:
+    {
+        "instance": String,
+        "config": String (e.g. "split+ls-first"),
+        "status": "ok" | "error",
+        "repeats": Int,
+        "parse_seconds": Float (median),
+        "preprocess_seconds": Float (median),
+        "solve_seconds": Float (median),
+        "solve_seconds_min": Float,
+        "total_seconds": Float (median of parse + preprocess + solve),
+        "peak_rss_kb": Optional[Int],
+        "objective": Int (best over the repeats),
+        "routes": Int,
+        "error": Optional[String]
+    }
+Results are written as JSON ({"meta": ..., "results": [...]}) or CSV, chosen by extension.
+"""
+import json
+import os
+import platform
+import statistics
+
+from datetime import datetime, timezone
+from time import perf_counter
+
+import pandas as pd
+
+from AuxFuncs import read_dat_to_graph, list_dat_files
+
+from BatchFuncs import solve_graph, preprocess_graph, run_in_pool
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_BENCHMARK_OUTPUT = os.path.join("benchmarks", "results.json")
+
+# Relative slowdown / cost increase flagged by compare, and the smallest slowdown (seconds) worth flagging
+DEFAULT_TIME_THRESHOLD = 0.10
+DEFAULT_COST_THRESHOLD = 0.0
+MIN_TIME_DIFFERENCE = 0.005
+
+
+def get_config_name(solver="constructive", local_search=None, metaheuristic=None, starts=1, max_iterations=None, **_):
+    name = solver
+    if starts > 1:
+        name += f"+starts-{starts}"
+    if local_search is not None:
+        name += f"+ls-{local_search}"
+    if metaheuristic is not None:
+        name += f"+{metaheuristic}"
+        if max_iterations is not None:
+            name += f"-{max_iterations}it"
+    return name
+
+
+def get_peak_rss_kb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_once(filename, use_cache, solver_options):
+    start = perf_counter()
+    graph, _ = read_dat_to_graph(filename, use_cache=use_cache)
+    parsed = perf_counter()
+    preprocess_graph(graph, **solver_options)
+    preprocessed = perf_counter()
+    routes, total_cost, _ = solve_graph(graph, **solver_options)
+    solved = perf_counter()
+
+    return {
+        "parse_seconds": parsed - start,
+        "preprocess_seconds": preprocessed - parsed,
+        "solve_seconds": solved - preprocessed,
+        "total_seconds": solved - start,
+        "objective": total_cost,
+        "routes": len(routes),
+    }
+
+
+# Runs inside the worker
+def benchmark_instance(filename, solver_options, warmup=1, repeats=3, use_cache=True):
+    row = {"instance": filename, "config": get_config_name(**solver_options), "status": "ok", "repeats": repeats}
+
+    try:
+        for _ in range(warmup):
+            run_once(filename, use_cache, solver_options)
+        runs = [run_once(filename, use_cache, solver_options) for _ in range(max(repeats, 1))]
+    except Exception as error:
+        row.update({"status": "error", "error": repr(error)})
+        return row
+
+    for key in ("parse_seconds", "preprocess_seconds", "solve_seconds"):
+        row[key] = statistics.median(run[key] for run in runs)
+    row["solve_seconds_min"] = min(run["solve_seconds"] for run in runs)
+    row["total_seconds"] = statistics.median(run["total_seconds"] for run in runs)
+    row["peak_rss_kb"] = get_peak_rss_kb()
+
+    best = min(runs, key=lambda run: run["objective"])
+    row["objective"] = best["objective"]
+    row["routes"] = best["routes"]
+
+    return row
+
+
+# Yields one row per (instance, configuration) as soon as it finishes
+def run_benchmark(configs, filenames=None, workers=1, warmup=1, repeats=3, use_cache=True):
+    if filenames is None:
+        filenames = list_dat_files(order="largest_first")
+
+    jobs = [
+        (filename, solver_options, warmup, repeats, use_cache)
+        for solver_options in configs
+        for filename in filenames
+    ]
+    yield from run_in_pool(benchmark_instance, jobs, workers, max_tasks_per_child=1)
+
+
+def get_benchmark_meta(warmup, repeats, workers):
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "warmup": warmup,
+        "repeats": repeats,
+        "workers": workers,
+    }
+
+
+def write_benchmark_results(rows, output_path=DEFAULT_BENCHMARK_OUTPUT, meta=None):
+    rows = sorted(rows, key=lambda row: (row["config"], row["instance"]))
+    folder = os.path.dirname(output_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    if output_path.endswith(".csv"):
+        pd.DataFrame(rows).to_csv(output_path, index=False)
+    else:
+        with open(output_path, "w") as f:
+            json.dump({"meta": meta or {}, "results": rows}, f, indent=2)
+
+
+def read_benchmark_results(path):
+    if path.endswith(".csv"):
+        table = pd.read_csv(path)
+        return table.astype(object).where(table.notna(), None).to_dict("records")
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+# Pairs the rows of two result files by (instance, config) and flags the ones that got
+# slower (solve time) or worse (objective) than the thresholds allow
+def compare_benchmarks(base_rows, new_rows, time_threshold=DEFAULT_TIME_THRESHOLD, cost_threshold=DEFAULT_COST_THRESHOLD):
+    base = {(row["instance"], row["config"]): row for row in base_rows if row["status"] == "ok"}
+    comparisons = []
+
+    for row in new_rows:
+        key = (row["instance"], row["config"])
+        if key not in base or row["status"] != "ok":
+            continue
+        old = base[key]
+
+        time_ratio = row["solve_seconds"] / old["solve_seconds"] if old["solve_seconds"] > 0 else 1.0
+        cost_ratio = row["objective"] / old["objective"] if old["objective"] > 0 else 1.0
+        slower = time_ratio > 1 + time_threshold and row["solve_seconds"] - old["solve_seconds"] > MIN_TIME_DIFFERENCE
+
+        comparisons.append({
+            "instance": row["instance"],
+            "config": row["config"],
+            "base_solve_seconds": old["solve_seconds"],
+            "new_solve_seconds": row["solve_seconds"],
+            "time_ratio": time_ratio,
+            "base_objective": old["objective"],
+            "new_objective": row["objective"],
+            "cost_ratio": cost_ratio,
+            "time_regression": slower,
+            "cost_regression": cost_ratio > 1 + cost_threshold,
+        })
+
+    return sorted(comparisons, key=lambda comparison: (comparison["config"], comparison["instance"]))
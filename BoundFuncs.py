@@ -0,0 +1,80 @@
+"""
+Fast lower bound on the solution cost, from the dense shortest-distance matrix.
+
+The matrix is read from the graph's cached all-pairs run (Graph.get_all_pairs_shortest_paths),
+the same one the solvers' per-node tables are built from, so a bound computed after solving
+adds no shortest-path work.
+
+Every solution pays each service cost once, plus one deadhead leg into every service
+(from the depot or from another service's exit) and one return leg per route. Taking
+the cheapest possible leg into each service, and the cheapest return times the
+minimum number of routes (total demand over capacity), gives a valid bound. The same
+argument on the legs leaving each service gives a second bound; the larger one is kept.
+    {
+        "lower_bound": Int,
+        "service_cost": Int,
+        "deadhead_bound": Int,
+        "min_routes": Int,
+        "optimal_value": Optional[Int] (from the instance header)
+    }
+"""
+import math
+
+import numpy as np
+
+from MultiStartFuncs import build_service_arrays
+
+
+def compute_lower_bound(graph):
+    services = graph.get_required_services()
+    result = {"lower_bound": 0, "service_cost": 0, "deadhead_bound": 0, "min_routes": 0, "optimal_value": graph.optimal_value}
+    if not services:
+        return result
+
+    matrix = graph.get_distance_matrix()
+    depot = graph.to_csr().index_of[graph.depot]
+    arrays = build_service_arrays(graph, services)
+    service_of = arrays["service_of"]
+    entries = arrays["entries"]
+    exits = arrays["exits"]
+
+    total_demand = sum(service.demand for service in services)
+    min_routes = math.ceil(total_demand / graph.capacity) if graph.capacity else 1
+
+    # links[a, b]: deadhead from the exit of orientation a to the entry of orientation b,
+    # never between two orientations of the same service
+    links = matrix[np.ix_(exits, entries)]
+    links[service_of[:, None] == service_of[None, :]] = np.inf
+
+    into = np.minimum(matrix[depot, entries], links.min(axis=0))
+    out_of = np.minimum(matrix[exits, depot], links.min(axis=1))
+
+    in_bound = get_per_service_minimum(into, service_of, len(services)).sum() + min_routes * matrix[exits, depot].min()
+    out_bound = get_per_service_minimum(out_of, service_of, len(services)).sum() + min_routes * matrix[depot, entries].min()
+    deadhead_bound = max(in_bound, out_bound)
+
+    service_cost = sum(service.service_cost for service in services)
+    # Distances are integer sums, so the bound can be rounded up
+    deadhead_bound = int(math.ceil(deadhead_bound)) if math.isfinite(deadhead_bound) else 0
+
+    result.update({
+        "lower_bound": service_cost + deadhead_bound,
+        "service_cost": service_cost,
+        "deadhead_bound": deadhead_bound,
+        "min_routes": min_routes,
+    })
+    return result
+
+
+# Cheapest value over the orientations of each service
+def get_per_service_minimum(values, service_of, total_services):
+    minimum = np.full(total_services, np.inf)
+    np.minimum.at(minimum, service_of, values)
+    return minimum
+
+
+# Relative gap of a cost to a reference value (None when there is no reference)
+def get_gap(cost, reference):
+    if reference is None or reference <= 0:
+        return None
+    return (cost - reference) / reference
@@ -0,0 +1,131 @@
+"""
+CSR Graph Model (frozen, compact form of a Graph):
+{
+    node_ids: int32 array (dense index -> node id),
+    index_of: Dict[int, int] (node id -> dense index),
+    offsets: int32 array of size V + 1,
+    destinies: int32 array of size C (dense indexes),
+    traversal_costs: int32 array of size C,
+    demands: int32 array of size C,
+    connection_types: int32 array of size C (0 = Edge, 1 = Arc),
+}
+The connections of the node at dense index i are the slice offsets[i]:offsets[i + 1].
+Depot and capacity are not part of it; use index_of[graph.depot] for the dense depot.
+"""
+import heapq
+import math
+
+import numpy as np
+
+
+class CSRGraph:
+    def __init__(self, graph):
+        self.node_ids = np.fromiter(graph.adj_list.keys(), dtype=np.int32, count=len(graph.adj_list))
+        self.index_of = {node_id: i for i, node_id in enumerate(graph.adj_list)}
+
+        sizes = [len(node.connections) for node in graph.adj_list.values()]
+        total = sum(sizes)
+
+        self.offsets = np.zeros(len(sizes) + 1, dtype=np.int32)
+        np.cumsum(sizes, out=self.offsets[1:])
+
+        self.destinies = np.empty(total, dtype=np.int32)
+        self.traversal_costs = np.empty(total, dtype=np.int32)
+        self.demands = np.empty(total, dtype=np.int32)
+        self.connection_types = np.empty(total, dtype=np.int32)
+
+        position = 0
+        for node in graph.adj_list.values():
+            for neighbor in node.connections:
+                self.destinies[position] = self.index_of[neighbor.destiny]
+                self.traversal_costs[position] = neighbor.traversal_cost
+                self.demands[position] = neighbor.demand
+                self.connection_types[position] = neighbor.type_code
+                position += 1
+
+        for array in (self.node_ids, self.offsets, self.destinies, self.traversal_costs, self.demands, self.connection_types):
+            array.flags.writeable = False
+
+    def get_total_of_vertexes(self):
+        return len(self.node_ids)
+
+    def get_origins(self):
+        return np.repeat(np.arange(len(self.node_ids), dtype=np.int32), np.diff(self.offsets))
+
+    def get_out_degrees(self):
+        return np.diff(self.offsets)
+
+    def get_in_degrees(self):
+        return np.bincount(self.destinies, minlength=len(self.node_ids))
+
+    # Same rule as Graph.get_vertex_min_degree: distinct (neighbor, type) pairs, in or out
+    def get_degrees(self):
+        origins = self.get_origins()
+        pairs = np.concatenate((
+            np.stack((origins, self.destinies, self.connection_types), axis=1),
+            np.stack((self.destinies, origins, self.connection_types), axis=1),
+        ))
+        if len(pairs) == 0:
+            return np.zeros(len(self.node_ids), dtype=np.int64)
+        pairs = np.unique(pairs, axis=0)
+        return np.bincount(pairs[:, 0], minlength=len(self.node_ids))
+
+    # Weakly connected components by min-label propagation over the connection arrays
+    def get_component_labels(self):
+        labels = np.arange(len(self.node_ids), dtype=np.int32)
+        origins = self.get_origins()
+
+        while True:
+            previous = labels.copy()
+            np.minimum.at(labels, origins, labels[self.destinies])
+            np.minimum.at(labels, self.destinies, labels[origins])
+            labels = labels[labels]
+            if np.array_equal(labels, previous):
+                return labels
+
+    def get_list_of_connected_components(self):
+        labels = self.get_component_labels()
+        _, first_seen, inverse = np.unique(labels, return_index=True, return_inverse=True)
+        order = np.argsort(first_seen)
+        return [self.node_ids[inverse == group].tolist() for group in order]
+
+    # Dijkstra over dense indexes, returns distance and predecessor arrays (-1 = none)
+    def dijkstra(self, source):
+        offsets = self.offsets.tolist()
+        destinies = self.destinies.tolist()
+        costs = self.traversal_costs.tolist()
+
+        dist = [math.inf] * (len(offsets) - 1)
+        pred = [-1] * len(dist)
+        dist[source] = 0
+        queue = [(0, source)]
+
+        while queue:
+            cost, node = heapq.heappop(queue)
+            if cost > dist[node]:
+                continue
+
+            for position in range(offsets[node], offsets[node + 1]):
+                neighbor = destinies[position]
+                new_cost = cost + costs[position]
+                if new_cost < dist[neighbor]:
+                    dist[neighbor] = new_cost
+                    pred[neighbor] = node
+                    heapq.heappush(queue, (new_cost, neighbor))
+
+        return np.array(dist, dtype=np.float64), np.array(pred, dtype=np.int32)
+
+    # Path between dense indexes, returned as original node ids
+    def reconstruct_path(self, pred, source, target):
+        if target != source and pred[target] == -1:
+            return []
+
+        path = [int(target)]
+        while pred[path[-1]] != -1:
+            path.append(int(pred[path[-1]]))
+
+        path.reverse()
+        return [int(self.node_ids[i]) for i in path]
+
+    def __repr__(self):
+        return f"CSRGraph(vertexes={len(self.node_ids)}, connections={len(self.destinies)})"
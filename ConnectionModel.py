@@ -6,14 +6,31 @@ Connection model:
         "demand": Int,
         "type": "A" | "E" (Arc or Edge)
     }
+The type is stored as a small int code (type_code); connection_type reads it back as "A" or "E".
 """
 
+EDGE_TYPE = 0
+ARC_TYPE = 1
+
+CONNECTION_TYPE_CODES = {"E": EDGE_TYPE, "A": ARC_TYPE}
+CONNECTION_TYPE_NAMES = ("E", "A")
+
 class Connection:
+    __slots__ = ("destiny", "traversal_cost", "demand", "type_code")
+
     def __init__(self, destiny, traversal_cost, demand = 0, connection_type = 'E'):
         self.destiny = destiny
         self.traversal_cost = traversal_cost
         self.demand = demand
-        self.connection_type = connection_type
+        self.type_code = CONNECTION_TYPE_CODES[connection_type]
+
+    @property
+    def connection_type(self):
+        return CONNECTION_TYPE_NAMES[self.type_code]
+
+    @connection_type.setter
+    def connection_type(self, connection_type):
+        self.type_code = CONNECTION_TYPE_CODES[connection_type]
 
     def __repr__(self):
-        return f"{{'destiny': {self.destiny}, 'traversal_cost': {self.traversal_cost}, 'demand': {self.demand}, 'connection_type': {self.connection_type}}}"
\ No newline at end of file
+        return f"{{'destiny': {self.destiny}, 'traversal_cost': {self.traversal_cost}, 'demand': {self.demand}, 'connection_type': {self.connection_type}}}"
@@ -5,13 +5,38 @@ Graph Model:
     required_nodes: Set[int],
     required_edges: Set[frozenset[int]],
     required_arcs: List[Tuple[int, int]],
+    services: List[Service] (required services in N, E, A input order),
     depot: Optional[int],
     capacity: Optional[int],
+    optimal_value: Optional[int] (known optimum from the instance header),
 }
+Derived quantities (CSR form, shortest paths, degrees, stats) are memoized in a metrics cache
+and dropped, together with whatever was derived from them, when the graph changes.
+Degrees (get_degrees) count the distinct neighbors of each node, per connection type code.
 """
 from collections import defaultdict, deque
 from NodeModel import Node
+from ConnectionModel import CONNECTION_TYPE_CODES, CONNECTION_TYPE_NAMES, EDGE_TYPE
+from CSRGraphModel import CSRGraph
+from ServiceModel import Service
+import heapq
 import math
+import random
+
+import numpy as np
+
+# Cached metric -> metrics it is derived from
+METRIC_DEPENDENCIES = {
+    "csr": (),
+    "link_counts": (),
+    "degrees": (),
+    "connected_components": (),
+    "all_pairs": ("csr",),
+    "betweenness_centrality": ("csr",),
+    "shortest_paths": ("all_pairs",),
+    "average_path_length": ("all_pairs",),
+    "diameter": ("all_pairs",),
+}
 
 class Graph:
     def __init__(self):
@@ -19,32 +44,68 @@ class Graph:
         self.required_nodes = set()
         self.required_edges = set()
         self.required_arcs = []
+        self.services = []
         self.depot = None
         self.capacity = None
+        self.optimal_value = None
+        self._metrics = {}
+
+    # Computes a metric on first use and reuses it until it is invalidated
+    def get_cached(self, name, compute):
+        if name not in self._metrics:
+            self._metrics[name] = compute()
+        return self._metrics[name]
+
+    # Drops the named metrics and everything derived from them; with no names, drops all
+    def invalidate_caches(self, *names):
+        if not names:
+            self._metrics.clear()
+            return
+
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            self._metrics.pop(name, None)
+            pending.extend(metric for metric, sources in METRIC_DEPENDENCIES.items() if name in sources)
 
     def add_node(self, node_id):
         if node_id not in self.adj_list:
             self.adj_list[node_id] = Node(node_id)
+            if self._metrics:
+                self.invalidate_caches()
 
-    def add_connection(self, origin, destiny, traversal_cost, demand, connection_type, required=True):
+    def add_connection(self, origin, destiny, traversal_cost, demand, connection_type, required=True, service_cost=0):
         self.add_node(origin)
         self.add_node(destiny)
+        if self._metrics:
+            self.invalidate_caches()
 
         if connection_type == "E":
             self.adj_list[origin].add_connection(destiny, traversal_cost, demand, connection_type)
             self.adj_list[destiny].add_connection(origin, traversal_cost, demand, connection_type)
             if required and demand > 0:
                 self.required_edges.add(frozenset([origin, destiny]))
+                self.add_service("E", origin, destiny, demand, traversal_cost, service_cost)
 
         elif connection_type == "A":
             self.adj_list[origin].add_connection(destiny, traversal_cost, demand, connection_type)
             if required and demand > 0:
                 self.required_arcs.append((origin, destiny))
+                self.add_service("A", origin, destiny, demand, traversal_cost, service_cost)
 
-    def mark_required_node(self, node_id):
+    def mark_required_node(self, node_id, demand=1, service_cost=0):
+        if node_id not in self.required_nodes:
+            self.add_service("N", node_id, node_id, demand, 0, service_cost)
         self.required_nodes.add(node_id)
         self.add_node(node_id)
 
+    def add_service(self, service_type, origin, destiny, demand, traversal_cost, service_cost):
+        service = Service(len(self.services) + 1, service_type, origin, destiny, demand, traversal_cost, service_cost)
+        self.services.append(service)
+
+    def get_required_services(self):
+        return self.services
+
     def set_depot(self, depot_id):
         self.depot = depot_id
         self.add_node(depot_id)
@@ -52,24 +113,32 @@ class Graph:
     def set_capacity(self, capacity):
         self.capacity = capacity
 
+    def set_optimal_value(self, optimal_value):
+        self.optimal_value = optimal_value
+
     def get_total_of_vertexes(self):
         return len(self.adj_list)
 
+    # (edges, arcs) in one pass; parallel edges between the same pair count once
+    def get_link_counts(self):
+        def compute():
+            seen = set()
+            arcs = 0
+            for node in self.adj_list.values():
+                for neighbor in node.connections:
+                    if neighbor.type_code == EDGE_TYPE:
+                        seen.add(frozenset((node.node_id, neighbor.destiny)))
+                    else:
+                        arcs += 1
+            return len(seen), arcs
+
+        return self.get_cached("link_counts", compute)
+
     def get_total_of_edges(self):
-        seen = set()
-        for node in self.adj_list.values():
-            for neighbor in node.connections:
-                if neighbor.connection_type == "E":
-                    seen.add(frozenset((node.node_id, neighbor.destiny)))
-        return len(seen)
+        return self.get_link_counts()[0]
 
     def get_total_of_arcs(self):
-        count = 0
-        for node in self.adj_list.values():
-            for neighbor in node.connections:
-                if neighbor.connection_type == "A":
-                    count += 1
-        return count
+        return self.get_link_counts()[1]
 
     def get_quantity_of_required_vertexes(self):
         return len(self.required_nodes)
@@ -81,83 +150,172 @@ class Graph:
         return len(self.required_arcs)
 
     def get_order_strength(self):
-        total_edges = self.get_total_of_edges()
-        total_arcs = self.get_total_of_arcs()
+        total_edges, total_arcs = self.get_link_counts()
         total = total_edges + total_arcs
         return total_arcs / total if total > 0 else 0
 
     def get_list_of_connected_components(self):
-        visited = set()
-        components = []
+        def compute():
+            visited = set()
+            components = []
 
-        for node_id in self.adj_list:
-            if node_id not in visited:
-                comp = bfs_for_connected_components(node_id, self.adj_list, visited)
-                components.append(comp)
+            for node_id in self.adj_list:
+                if node_id not in visited:
+                    comp = bfs_for_connected_components(node_id, self.adj_list, visited)
+                    components.append(comp)
 
-        return components
+            return components
+
+        return self.get_cached("connected_components", compute)
+
+    # node id -> distinct neighbors per connection type code, in one pass over the links.
+    # Each (neighbor, type) pair counts once per node, whichever direction it was seen in
+    def get_degrees(self):
+        def compute():
+            neighbors = {node_id: [set() for _ in CONNECTION_TYPE_NAMES] for node_id in self.adj_list}
+            for node in self.adj_list.values():
+                for connection in node.connections:
+                    neighbors[node.node_id][connection.type_code].add(connection.destiny)
+                    neighbors[connection.destiny][connection.type_code].add(node.node_id)
+            return {node_id: [len(group) for group in groups] for node_id, groups in neighbors.items()}
+
+        return self.get_cached("degrees", compute)
 
     def get_vertex_min_degree(self):
-        min_deg = float('inf')
-        for node in self.adj_list.values():
-            connected = set()
-            for neighbor in node.connections:
-                connected.add((neighbor.destiny, neighbor.connection_type))
-            for other in self.adj_list.values():
-                for neighbor in other.connections:
-                    if neighbor.destiny == node.node_id:
-                        connected.add((other.node_id, neighbor.connection_type))
-            min_deg = min(min_deg, len(connected))
-        return min_deg if self.adj_list else 0
+        return min((sum(counts) for counts in self.get_degrees().values()), default=0)
 
     def get_vertex_max_degree(self):
-        max_deg = 0
-        for node in self.adj_list.values():
-            connected = set()
-            for neighbor in node.connections:
-                connected.add((neighbor.destiny, neighbor.connection_type))
-            for other in self.adj_list.values():
-                for neighbor in other.connections:
-                    if neighbor.destiny == node.node_id:
-                        connected.add((other.node_id, neighbor.connection_type))
-            max_deg = max(max_deg, len(connected))
-        return max_deg
-
-    def betweenness_centrality(self):
-        dist, next_node_dict = floyd_warshall(self)
-        centrality = defaultdict(int)
-        nodes = list(self.adj_list)
-
-        for u in nodes:
-            for v in nodes:
-                if u != v:
-                    path = reconstruct_path(u, v, next_node_dict)
-                    for node in path[1:-1]:
-                        centrality[node] += 1
-
-        return dict(centrality)
+        return max((sum(counts) for counts in self.get_degrees().values()), default=0)
+
+    # Degree distribution over all nodes, for one connection type ("E" or "A") or both (None):
+    # {min, max, mean, histogram: {degree: number of nodes}}
+    def get_degree_distribution(self, connection_type=None):
+        if connection_type is None:
+            values = [sum(counts) for counts in self.get_degrees().values()]
+        else:
+            type_code = CONNECTION_TYPE_CODES[connection_type]
+            values = [counts[type_code] for counts in self.get_degrees().values()]
+
+        histogram = defaultdict(int)
+        for value in values:
+            histogram[value] += 1
+
+        return {
+            "min": min(values, default=0),
+            "max": max(values, default=0),
+            "mean": sum(values) / len(values) if values else 0,
+            "histogram": dict(sorted(histogram.items())),
+        }
+
+    def get_degree_distributions(self):
+        distributions = {"all": self.get_degree_distribution()}
+        for connection_type in CONNECTION_TYPE_NAMES:
+            distributions[connection_type] = self.get_degree_distribution(connection_type)
+        return distributions
+
+    # Brandes betweenness; with k (at least 1), only k sampled sources are used and the result is rescaled
+    # The exact (k=None) result is cached
+    def betweenness_centrality(self, k=None, seed=None):
+        if k is None:
+            return self.get_cached("betweenness_centrality", self.compute_betweenness_centrality)
+        return self.compute_betweenness_centrality(k, seed)
+
+    def compute_betweenness_centrality(self, k=None, seed=None):
+        if k is not None and k < 1:
+            raise ValueError(f"betweenness needs at least one sampled source, got k={k}")
+
+        csr = self.to_csr()
+        total = csr.get_total_of_vertexes()
+        sources = range(total)
+        scale = 1
+
+        if k is not None and k < total:
+            sources = random.Random(seed).sample(range(total), k)
+            scale = total / k
+
+        centrality = brandes_betweenness(csr, sources)
+        node_ids = csr.node_ids.tolist()
+
+        return {node_ids[i]: value * scale for i, value in enumerate(centrality)}
 
     def get_average_path_length(self):
-        dist, _ = floyd_warshall(self)
-        total = 0
-        count = 0
-
-        for u in self.adj_list:
-            for v in self.adj_list:
-                if u != v and dist[u][v] != math.inf:
-                    total += dist[u][v]
-                    count += 1
+        def compute():
+            dist = self.get_distance_matrix()
+            reachable = np.isfinite(dist)
+            np.fill_diagonal(reachable, False)
+            return float(dist[reachable].mean()) if reachable.any() else 0
 
-        return total / count if count else 0
+        return self.get_cached("average_path_length", compute)
 
     def get_diameter(self):
-        dist, _ = floyd_warshall(self)
-        dia = 0
-        for u in self.adj_list:
-            for v in self.adj_list:
-                if u != v and dist[u][v] != math.inf:
-                    dia = max(dia, dist[u][v])
-        return dia
+        def compute():
+            dist = self.get_distance_matrix()
+            reachable = np.isfinite(dist)
+            np.fill_diagonal(reachable, False)
+            return int(dist[reachable].max()) if reachable.any() else 0
+
+        return self.get_cached("diameter", compute)
+
+    # All-pairs shortest paths over the CSR dense indexes, one one-to-all Dijkstra per source:
+    # dense (V x V) distance (inf = unreachable) and predecessor (-1 = none) matrices.
+    # Every all-pairs table of the graph is read from this single run
+    def get_all_pairs_shortest_paths(self):
+        def compute():
+            csr = self.to_csr()
+            total = csr.get_total_of_vertexes()
+            dist = np.empty((total, total))
+            pred = np.empty((total, total), dtype=np.int32)
+            for source in range(total):
+                dist[source], pred[source] = csr.dijkstra(source)
+            return dist, pred
+
+        return self.get_cached("all_pairs", compute)
+
+    # Dense (V x V) shortest distances over the CSR dense indexes
+    def get_distance_matrix(self):
+        return self.get_all_pairs_shortest_paths()[0]
+
+    # Frozen compact (CSR) form of the graph, rebuilt only after a mutation
+    def to_csr(self):
+        return self.get_cached("csr", lambda: CSRGraph(self))
+
+    # The all-pairs shortest paths keyed by node id, as the solvers read them:
+    # dist[u][v] and pred[u][v] (None at u) for every v reachable from u
+    def get_shortest_paths(self):
+        def compute():
+            matrix, pred_matrix = self.get_all_pairs_shortest_paths()
+            node_ids = self.to_csr().node_ids
+            dist = {}
+            pred = {}
+            for source, node_id in enumerate(node_ids.tolist()):
+                reachable = np.isfinite(matrix[source])
+                targets = node_ids[reachable].tolist()
+                dist[node_id] = dict(zip(targets, matrix[source, reachable].astype(np.int64).tolist()))
+                pred[node_id] = dict(zip(targets, node_ids[pred_matrix[source, reachable]].tolist()))
+                pred[node_id][node_id] = None
+            return dist, pred
+
+        return self.get_cached("shortest_paths", compute)
+
+    # Every stat of graph_stats_table in one call; the path metrics share one distance matrix.
+    # betweenness_samples limits the centrality to that many sampled sources
+    def compute_all_stats(self, betweenness_samples=None, seed=None):
+        return {
+            "total_of_vertexes": self.get_total_of_vertexes(),
+            "total_of_edges": self.get_total_of_edges(),
+            "total_of_arcs": self.get_total_of_arcs(),
+            "required_vertexes": self.get_quantity_of_required_vertexes(),
+            "required_edges": self.get_quantity_of_required_edges(),
+            "required_arcs": self.get_quantity_of_required_arcs(),
+            "order_strength": self.get_order_strength(),
+            "connected_components": self.get_list_of_connected_components(),
+            "min_degree": self.get_vertex_min_degree(),
+            "max_degree": self.get_vertex_max_degree(),
+            "degree_distributions": self.get_degree_distributions(),
+            "betweenness_centrality": self.betweenness_centrality(betweenness_samples, seed),
+            "average_path_length": self.get_average_path_length(),
+            "diameter": self.get_diameter(),
+        }
 
     def __repr__(self):
         return str(self.adj_list)
@@ -178,48 +336,88 @@ def bfs_for_connected_components(start_node, graph_nodes, visited_set):
 
     return component
 
-# Floyd-Warshall algorithm
-def floyd_warshall(graph):
-    dist = {}
-    next_node_dict = {}
-    vertexes = list(graph.adj_list.keys())
+# Dijkstra keeping a distance map and predecessor links only; paths are rebuilt once at the
+# end with reconstruct_dijkstra_path. With targets, it stops as soon as all of them are
+# settled, so only their entries (and those of nodes settled before) are final
+def dijkstra(graph, source, targets=None):
+    dist = {source: 0}
+    pred = {source: None}
+    queue = [(0, source)]
+    remaining = set(targets) if targets is not None else None
 
-    for u in vertexes:
-        dist[u] = {}
-        next_node_dict[u] = {}
-
-        for v in vertexes:
-            dist[u][v] = math.inf
-            next_node_dict[u][v] = None
-
-        dist[u][u] = 0
-
-    for u in graph.adj_list:
-        for neighbor in graph.adj_list[u].connections:
-            v = neighbor.destiny
-            cost = neighbor.traversal_cost
-            dist[u][v] = cost
-            next_node_dict[u][v] = v
-
-    for k in vertexes:
-        for i in vertexes:
-            for j in vertexes:
-                if dist[i][k] + dist[k][j] < dist[i][j]:
-                    dist[i][j] = dist[i][k] + dist[k][j]
-                    next_node_dict[i][j] = next_node_dict[i][k]
-
-    return dist, next_node_dict
-
-def reconstruct_path(u, v, next_node):
-    if next_node[u][v] is None:
+    while queue:
+        cost, node = heapq.heappop(queue)
+        if cost > dist[node]:
+            continue
+
+        if remaining is not None:
+            remaining.discard(node)
+            if not remaining:
+                break
+
+        for neighbor in graph.adj_list[node].connections:
+            new_cost = cost + neighbor.traversal_cost
+            if new_cost < dist.get(neighbor.destiny, math.inf):
+                dist[neighbor.destiny] = new_cost
+                pred[neighbor.destiny] = node
+                heapq.heappush(queue, (new_cost, neighbor.destiny))
+
+    return dist, pred
+
+def reconstruct_dijkstra_path(pred_row, v):
+    if v not in pred_row:
         return []
 
-    path = [u]
+    path = [v]
 
-    while u != v:
-        u = next_node[u][v]
-        path.append(u)
+    while pred_row[v] is not None:
+        v = pred_row[v]
+        path.append(v)
 
+    path.reverse()
     return path
 
-
+# Brandes algorithm: weighted Dijkstra per source plus dependency accumulation
+def brandes_betweenness(csr, sources):
+    offsets = csr.offsets.tolist()
+    destinies = csr.destinies.tolist()
+    costs = csr.traversal_costs.tolist()
+    total = len(offsets) - 1
+    centrality = [0.0] * total
+
+    for source in sources:
+        dist = [math.inf] * total
+        sigma = [0] * total
+        preds = [[] for _ in range(total)]
+        settled = []
+
+        dist[source] = 0
+        sigma[source] = 1
+        queue = [(0, source)]
+
+        while queue:
+            cost, node = heapq.heappop(queue)
+            if cost > dist[node]:
+                continue
+            settled.append(node)
+
+            for position in range(offsets[node], offsets[node + 1]):
+                neighbor = destinies[position]
+                new_cost = cost + costs[position]
+                if new_cost < dist[neighbor]:
+                    dist[neighbor] = new_cost
+                    sigma[neighbor] = sigma[node]
+                    preds[neighbor] = [node]
+                    heapq.heappush(queue, (new_cost, neighbor))
+                elif new_cost == dist[neighbor] and neighbor != source:
+                    sigma[neighbor] += sigma[node]
+                    preds[neighbor].append(node)
+
+        delta = [0.0] * total
+        for node in reversed(settled):
+            for pred in preds[node]:
+                delta[pred] += sigma[pred] / sigma[node] * (1 + delta[node])
+            if node != source:
+                centrality[node] += delta[node]
+
+    return centrality
@@ -0,0 +1,279 @@
+"""
+Local search improvement over trips of (service, entry, exit) visits.
+
+Moves: relocate and swap (inside a route and between routes), 2-opt (segment
+reversal inside a route) and 2-opt* (tail exchange between routes). Every move is
+priced in O(1) from the shared shortest-path distances and per-route caches of
+links, prefix sums and loads, so no route is re-walked to evaluate a move.
+"""
+import math
+
+from time import perf_counter
+
+from SolutionFuncs import SOLUTION_BUILDERS, build_routes_from_trips, get_routes_cost
+
+EPSILON = 1e-9
+
+
+class RouteState:
+    def __init__(self, trip, depot, dist):
+        sentinel = (None, depot, depot)
+        self.visits = [sentinel] + list(trip) + [sentinel]
+        self.dist = dist
+        self.refresh()
+
+    # Rebuilds the caches after the visits changed: O(len(route))
+    def refresh(self):
+        visits = self.visits
+        dist = self.dist
+        total = len(visits)
+
+        self.links = [dist[visits[k][2]].get(visits[k + 1][1], math.inf) for k in range(total - 1)]
+        self.reverse_links = [dist[visits[k + 1][1]].get(visits[k][2], math.inf) for k in range(total - 1)]
+
+        self.forward_prefix = [0] * total
+        self.reverse_prefix = [0] * total
+        self.arcs_prefix = [0] * total
+        self.load_prefix = [0] * total
+
+        for k in range(1, total):
+            service = visits[k - 1][0]
+            self.forward_prefix[k] = self.forward_prefix[k - 1] + self.links[k - 1]
+            self.reverse_prefix[k] = self.reverse_prefix[k - 1] + self.reverse_links[k - 1]
+            self.arcs_prefix[k] = self.arcs_prefix[k - 1] + (service is not None and service.service_type == "A")
+            self.load_prefix[k] = self.load_prefix[k - 1] + (service.demand if service is not None else 0)
+
+        self.load = self.load_prefix[-1]
+        self.cost = self.forward_prefix[-1] + sum(v[0].service_cost for v in visits[1:-1])
+
+    def get_trip(self):
+        return self.visits[1:-1]
+
+    def __len__(self):
+        return len(self.visits) - 2
+
+
+class LocalSearch:
+    def __init__(self, trips, dist, depot, capacity, deadline=None, strategy="first"):
+        self.dist = dist
+        self.depot = depot
+        self.capacity = capacity
+        self.deadline = deadline
+        self.strategy = strategy
+        self.routes = [RouteState(trip, depot, dist) for trip in trips]
+
+    def d(self, u, v):
+        return self.dist[u].get(v, math.inf)
+
+    def is_out_of_time(self):
+        return self.deadline is not None and perf_counter() >= self.deadline
+
+    # Each neighborhood yields (delta, apply) pairs for improving moves
+    def get_neighborhoods(self):
+        return [self.relocate_moves, self.swap_moves, self.two_opt_moves, self.two_opt_star_moves]
+
+    def run(self):
+        while not self.is_out_of_time():
+            best = None
+
+            for neighborhood in self.get_neighborhoods():
+                for delta, apply in neighborhood():
+                    if best is None or delta < best[0]:
+                        best = (delta, apply)
+                    if self.strategy == "first" or self.is_out_of_time():
+                        break
+                if best is not None and (self.strategy == "first" or self.is_out_of_time()):
+                    break
+
+            if best is None:
+                break
+
+            best[1]()
+
+        return [route.get_trip() for route in self.routes if len(route) > 0]
+
+    def relocate_moves(self):
+        routes = self.routes
+        d = self.d
+
+        for r1, route1 in enumerate(routes):
+            if self.is_out_of_time():
+                return
+            v1 = route1.visits
+
+            for i in range(1, len(v1) - 1):
+                visit = v1[i]
+                removal = d(v1[i - 1][2], v1[i + 1][1]) - route1.links[i - 1] - route1.links[i]
+                if removal == math.inf:
+                    continue
+
+                for r2, route2 in enumerate(routes):
+                    if r2 != r1 and route2.load + visit[0].demand > self.capacity:
+                        continue
+                    v2 = route2.visits
+
+                    for j in range(1, len(v2)):
+                        if r2 == r1 and (j == i or j == i + 1):
+                            continue
+                        before = v2[j - 1][2]
+                        after = v2[j][1]
+                        for entry, exit in visit[0].get_orientations():
+                            delta = removal + d(before, entry) + d(exit, after) - route2.links[j - 1]
+                            if delta < -EPSILON:
+                                yield delta, self.make_relocate(r1, i, r2, j, (visit[0], entry, exit))
+
+    def make_relocate(self, r1, i, r2, j, visit):
+        def apply():
+            route1 = self.routes[r1]
+            route2 = self.routes[r2]
+            del route1.visits[i]
+            route2.visits.insert(j - 1 if r1 == r2 and j > i else j, visit)
+            route1.refresh()
+            if r2 != r1:
+                route2.refresh()
+        return apply
+
+    def swap_moves(self):
+        routes = self.routes
+        d = self.d
+
+        for r1, route1 in enumerate(routes):
+            if self.is_out_of_time():
+                return
+            v1 = route1.visits
+
+            for i in range(1, len(v1) - 1):
+                for r2 in range(r1, len(routes)):
+                    route2 = routes[r2]
+                    v2 = route2.visits
+
+                    for j in range(i + 2 if r2 == r1 else 1, len(v2) - 1):
+                        first = v1[i]
+                        second = v2[j]
+                        if r2 != r1:
+                            change = second[0].demand - first[0].demand
+                            if route1.load + change > self.capacity or route2.load - change > self.capacity:
+                                continue
+
+                        old = route1.links[i - 1] + route1.links[i] + route2.links[j - 1] + route2.links[j]
+                        new_first = min(
+                            (d(v1[i - 1][2], entry) + d(exit, v1[i + 1][1]), (second[0], entry, exit))
+                            for entry, exit in second[0].get_orientations()
+                        )
+                        new_second = min(
+                            (d(v2[j - 1][2], entry) + d(exit, v2[j + 1][1]), (first[0], entry, exit))
+                            for entry, exit in first[0].get_orientations()
+                        )
+                        delta = new_first[0] + new_second[0] - old
+                        if delta < -EPSILON:
+                            yield delta, self.make_swap(r1, i, r2, j, new_first[1], new_second[1])
+
+    def make_swap(self, r1, i, r2, j, into_first, into_second):
+        def apply():
+            route1 = self.routes[r1]
+            route2 = self.routes[r2]
+            route1.visits[i] = into_first
+            route2.visits[j] = into_second
+            route1.refresh()
+            if r2 != r1:
+                route2.refresh()
+        return apply
+
+    # Reverses visits i..j of a route; only segments without arcs can be reversed
+    def two_opt_moves(self):
+        d = self.d
+
+        for r, route in enumerate(self.routes):
+            if self.is_out_of_time():
+                return
+            visits = route.visits
+
+            for i in range(1, len(visits) - 2):
+                for j in range(i + 1, len(visits) - 1):
+                    if route.arcs_prefix[j + 1] - route.arcs_prefix[i]:
+                        break
+
+                    inner_old = route.forward_prefix[j] - route.forward_prefix[i]
+                    inner_new = route.reverse_prefix[j] - route.reverse_prefix[i]
+                    delta = (
+                        d(visits[i - 1][2], visits[j][2]) + inner_new + d(visits[i][1], visits[j + 1][1])
+                        - route.links[i - 1] - inner_old - route.links[j]
+                    )
+                    if delta < -EPSILON:
+                        yield delta, self.make_two_opt(r, i, j)
+
+    def make_two_opt(self, r, i, j):
+        def apply():
+            route = self.routes[r]
+            segment = [(service, exit, entry) for service, entry, exit in reversed(route.visits[i:j + 1])]
+            route.visits[i:j + 1] = segment
+            route.refresh()
+        return apply
+
+    # Exchanges the tails of two routes: route1 keeps visits before i, route2 before j
+    def two_opt_star_moves(self):
+        routes = self.routes
+        d = self.d
+
+        for r1, route1 in enumerate(routes):
+            if self.is_out_of_time():
+                return
+            v1 = route1.visits
+
+            for r2 in range(r1 + 1, len(routes)):
+                route2 = routes[r2]
+                v2 = route2.visits
+
+                for i in range(1, len(v1)):
+                    head1 = route1.load_prefix[i]
+                    tail1 = route1.load - head1
+
+                    for j in range(1, len(v2)):
+                        if (i == 1 and j == 1) or (i == len(v1) - 1 and j == len(v2) - 1):
+                            continue
+                        head2 = route2.load_prefix[j]
+                        if head1 + route2.load - head2 > self.capacity or head2 + tail1 > self.capacity:
+                            continue
+
+                        delta = (
+                            d(v1[i - 1][2], v2[j][1]) + d(v2[j - 1][2], v1[i][1])
+                            - route1.links[i - 1] - route2.links[j - 1]
+                        )
+                        if delta < -EPSILON:
+                            yield delta, self.make_two_opt_star(r1, i, r2, j)
+
+    def make_two_opt_star(self, r1, i, r2, j):
+        def apply():
+            route1 = self.routes[r1]
+            route2 = self.routes[r2]
+            tail1 = route1.visits[i:]
+            route1.visits[i:] = route2.visits[j:]
+            route2.visits[j:] = tail1
+            route1.refresh()
+            route2.refresh()
+        return apply
+
+
+# Improves trips until no improving move is left or time_limit (seconds) runs out.
+# strategy: "first" applies the first improving move found, "best" the best one
+def local_search(trips, dist, depot, capacity, time_limit=None, strategy="first"):
+    deadline = perf_counter() + time_limit if time_limit is not None else None
+    return LocalSearch(trips, dist, depot, capacity, deadline, strategy).run()
+
+
+def local_search_algorithm_from_graph(graph, solver="split", time_limit=None, strategy="first"):
+    start_total = perf_counter()
+
+    trips = [route.get_trip() for route in SOLUTION_BUILDERS[solver](graph)]
+    dist, _ = graph.get_shortest_paths()
+
+    remaining = time_limit - (perf_counter() - start_total) if time_limit is not None else None
+    trips = local_search(trips, dist, graph.depot, graph.capacity, remaining, strategy)
+
+    routes = build_routes_from_trips(trips, graph)
+    total_cost = get_routes_cost(routes)
+
+    end_total = perf_counter()
+    clocks_used = int((end_total - start_total) * 1e6)
+
+    return routes, total_cost, clocks_used
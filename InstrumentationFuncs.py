@@ -0,0 +1,227 @@
+"""
+Optional instrumentation of a solver run.
+
+While an Instrumentation block is active, the functions listed in PHASES and
+FUNCTIONS are wrapped in place to count calls and time them, and the heapq module
+seen by the graph and solver modules is swapped for a counting proxy. Everything is
+restored on exit, so a run without the block pays nothing. One report per run:
+    {
+        "instance": String,
+        "total_seconds": Float,
+        "phases": Dict[String, {calls: Int, seconds: Float}] (parse, preprocess, solve, export; inclusive),
+        "functions": Dict[String, {calls: Int, seconds: Float}],
+        "counters": {heap_pushes: Int, heap_pops: Int, dijkstra_runs: Int, candidates_scanned: Int},
+        "profile": Optional[List[{function, calls, total_seconds, cumulative_seconds}]],
+        "memory": Optional[{peak_kb: Float, top: List[{location, size_kb, count}]}]
+    }
+"""
+import cProfile
+import functools
+import heapq
+import importlib
+import json
+import os
+import pstats
+import tracemalloc
+
+from time import perf_counter
+
+DEFAULT_INSTRUMENTATION_FOLDER = "instrumentation"
+
+PROFILE_TOP = 30
+MEMORY_TOP = 20
+
+# Phase -> (module, attribute) pairs; "Class.method" wraps a method
+PHASES = {
+    "parse": [("AuxFuncs", "read_dat_to_graph")],
+    "preprocess": [("GraphModel", "Graph.get_shortest_paths"), ("GraphModel", "Graph.get_all_pairs_shortest_paths"),
+                   ("GraphModel", "Graph.to_csr")],
+    "solve": [("BatchFuncs", "solve_graph")],
+    "export": [("AuxFuncs", "export_solution_to_dat")],
+}
+
+FUNCTIONS = [
+    ("GraphModel", "dijkstra"),
+    ("CSRGraphModel", "CSRGraph.dijkstra"),
+    ("SolutionFuncs", "dijkstra_nearest_service"),
+    ("SolutionFuncs", "path_scanning_giant_tour"),
+    ("SolutionFuncs", "ulusoy_split"),
+    ("ImprovementFuncs", "local_search"),
+    ("MetaheuristicFuncs", "get_best_insertion"),
+    ("MultiStartFuncs", "multi_start_construction"),
+]
+
+DIJKSTRA_FUNCTIONS = ("dijkstra", "CSRGraph.dijkstra", "dijkstra_nearest_service")
+
+# Modules whose heap operations are counted
+HEAP_MODULES = ("GraphModel", "CSRGraphModel", "SolutionFuncs")
+
+# Modules that import the wrapped functions by name
+IMPORTING_MODULES = ("AuxFuncs", "GraphModel", "CSRGraphModel", "SolutionFuncs", "ImprovementFuncs",
+                     "MetaheuristicFuncs", "MultiStartFuncs", "BatchFuncs", "__main__")
+
+
+class CountingHeapq:
+    def __init__(self, counters):
+        self.counters = counters
+
+    def heappush(self, queue, item):
+        self.counters["heap_pushes"] += 1
+        heapq.heappush(queue, item)
+
+    def heappop(self, queue):
+        self.counters["heap_pops"] += 1
+        return heapq.heappop(queue)
+
+    def __getattr__(self, name):
+        return getattr(heapq, name)
+
+
+# Counts the services looked at by the nearest-service search at each settled node
+class CountingServices:
+    def __init__(self, services_by_node, counters):
+        self.services_by_node = services_by_node
+        self.counters = counters
+
+    def get(self, node, default=None):
+        services = self.services_by_node.get(node, default)
+        if services:
+            self.counters["candidates_scanned"] += len(services)
+        return services
+
+
+class Instrumentation:
+    def __init__(self, instance=None, profile=False, trace_memory=False):
+        self.instance = instance
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.timings = {}
+        self.counters = {"heap_pushes": 0, "heap_pops": 0, "dijkstra_runs": 0, "candidates_scanned": 0}
+        self.patches = []
+        self.profiler = None
+        self.memory = None
+
+    def __enter__(self):
+        for phase, targets in PHASES.items():
+            for module_name, attribute in targets:
+                self.wrap(module_name, attribute, ("phases", phase))
+        for module_name, attribute in FUNCTIONS:
+            self.wrap(module_name, attribute, ("functions", attribute))
+
+        proxy = CountingHeapq(self.counters)
+        for module_name in HEAP_MODULES:
+            self.patch(importlib.import_module(module_name), "heapq", proxy)
+
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.total_seconds = perf_counter() - self.start
+
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.memory = {
+                "peak_kb": peak / 1024,
+                "top": [
+                    {"location": str(stat.traceback[0]), "size_kb": stat.size / 1024, "count": stat.count}
+                    for stat in snapshot.statistics("lineno")[:MEMORY_TOP]
+                ],
+            }
+
+        for owner, name, original in reversed(self.patches):
+            setattr(owner, name, original)
+        self.patches = []
+        return False
+
+    def patch(self, owner, name, value):
+        self.patches.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, value)
+
+    # Replaces the function in its module, in every module that imported it by name, or on its class
+    def wrap(self, module_name, attribute, key):
+        module = importlib.import_module(module_name)
+        if "." in attribute:
+            class_name, name = attribute.split(".")
+            owners = [getattr(module, class_name)]
+        else:
+            name = attribute
+            owners = [module]
+        original = getattr(owners[0], name)
+
+        for other_name in IMPORTING_MODULES:
+            other = importlib.import_module(other_name)
+            if other is not module and getattr(other, name, None) is original:
+                owners.append(other)
+
+        wrapper = self.make_wrapper(original, key, attribute)
+        for owner in owners:
+            self.patch(owner, name, wrapper)
+
+    def make_wrapper(self, original, key, attribute):
+        timing = self.timings.setdefault(key, {"calls": 0, "seconds": 0.0})
+        counters = self.counters
+        is_dijkstra = attribute in DIJKSTRA_FUNCTIONS
+        counts_candidates = attribute == "dijkstra_nearest_service"
+
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            if is_dijkstra:
+                counters["dijkstra_runs"] += 1
+            if counts_candidates:
+                args = args[:2] + (CountingServices(args[2], counters),) + args[3:]
+            start = perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                timing["calls"] += 1
+                timing["seconds"] += perf_counter() - start
+
+        return wrapper
+
+    def get_profile_rows(self):
+        stats = pstats.Stats(self.profiler)
+        stats.sort_stats("cumulative")
+        rows = []
+        for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+            if filename == __file__:
+                continue
+            rows.append({
+                "function": f"{os.path.basename(filename)}:{line}({function})",
+                "calls": calls,
+                "total_seconds": total,
+                "cumulative_seconds": cumulative,
+            })
+        rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+        return rows[:PROFILE_TOP]
+
+    def report(self):
+        report = {
+            "instance": self.instance,
+            "total_seconds": self.total_seconds,
+            "phases": {key[1]: value for key, value in self.timings.items() if key[0] == "phases"},
+            "functions": {key[1]: value for key, value in self.timings.items() if key[0] == "functions" and value["calls"]},
+            "counters": dict(self.counters),
+        }
+        if self.profiler is not None:
+            report["profile"] = self.get_profile_rows()
+        if self.memory is not None:
+            report["memory"] = self.memory
+        return report
+
+
+def write_instrumentation_report(report, folder=DEFAULT_INSTRUMENTATION_FOLDER):
+    os.makedirs(folder, exist_ok=True)
+    output_path = os.path.join(folder, f"{os.path.splitext(report['instance'])[0]}.json")
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    return output_path
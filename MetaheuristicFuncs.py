@@ -0,0 +1,274 @@
+"""
+Adaptive large neighborhood search (ALNS) over trips of (service, entry, exit) visits.
+
+Each iteration removes part of the current solution (random or worst removal) and
+reinserts the removed services (greedy or regret-2 insertion). Candidates are
+accepted by simulated annealing with a temperature that falls to zero at the end of
+the time budget. The best solution found so far is reported through a callback on
+every improvement, so an interrupted run still leaves its incumbent behind.
+"""
+import math
+import random
+
+from time import perf_counter
+
+from ImprovementFuncs import local_search
+from SolutionFuncs import SOLUTION_BUILDERS, build_routes_from_trips, get_trips_cost
+
+DEFAULT_TIME_LIMIT = 10
+
+# Share of the services removed per iteration
+MIN_REMOVAL_RATIO = 0.05
+MAX_REMOVAL_RATIO = 0.3
+MAX_REMOVED = 40
+
+# Operator scores: new best, better than current, accepted
+SCORE_BEST = 33
+SCORE_BETTER = 9
+SCORE_ACCEPTED = 13
+REACTION = 0.1
+
+# Randomization of the worst removal (higher is greedier)
+WORST_REMOVAL_POWER = 3
+
+# A candidate 5% worse than the start is accepted with probability 0.5 at the beginning
+START_WORSENING = 0.05
+
+
+def copy_trips(trips):
+    return [list(trip) for trip in trips]
+
+
+def get_removal_gain(trip, position, dist, depot):
+    before = trip[position - 1][2] if position > 0 else depot
+    after = trip[position + 1][1] if position + 1 < len(trip) else depot
+    service, entry, exit = trip[position]
+    return (
+        dist[before].get(entry, math.inf) + service.service_cost + dist[exit].get(after, math.inf)
+        - dist[before].get(after, math.inf)
+    )
+
+
+def random_removal(trips, count, rng, dist, depot):
+    positions = [(r, i) for r, trip in enumerate(trips) for i in range(len(trip))]
+    chosen = rng.sample(positions, min(count, len(positions)))
+    return remove_positions(trips, chosen)
+
+
+# Removes the visits that cost the most, with a randomized pick over the sorted list
+def worst_removal(trips, count, rng, dist, depot):
+    gains = sorted(
+        ((get_removal_gain(trip, i, dist, depot), r, i) for r, trip in enumerate(trips) for i in range(len(trip))),
+        reverse=True,
+    )
+    chosen = set()
+
+    while len(chosen) < min(count, len(gains)):
+        _, r, i = gains[int(rng.random() ** WORST_REMOVAL_POWER * len(gains))]
+        chosen.add((r, i))
+
+    return remove_positions(trips, chosen)
+
+
+def remove_positions(trips, positions):
+    removed = [trips[r][i][0] for r, i in positions]
+    chosen = set(positions)
+    partial = [[visit for i, visit in enumerate(trip) if (r, i) not in chosen] for r, trip in enumerate(trips)]
+    return [trip for trip in partial if trip], removed
+
+
+# Cheapest feasible insertion of a service into one trip: (extra cost, position, visit)
+def get_best_insertion(trip, load, service, dist, depot, capacity):
+    if load + service.demand > capacity:
+        return None
+
+    best = None
+    for position in range(len(trip) + 1):
+        before = trip[position - 1][2] if position > 0 else depot
+        after = trip[position][1] if position < len(trip) else depot
+        base = dist[before].get(after, math.inf)
+
+        for entry, exit in service.get_orientations():
+            extra = dist[before].get(entry, math.inf) + service.service_cost + dist[exit].get(after, math.inf) - base
+            if best is None or extra < best[0]:
+                best = (extra, position, (service, entry, exit))
+
+    return best
+
+
+# Inserts every removed service. regret = 1 is greedy cheapest insertion, regret = 2
+# inserts first the service that would lose the most by not getting its best trip.
+# Best insertions are cached per (service, trip) and refreshed only for the trip that changed
+def insert_services(trips, removed, dist, depot, capacity, regret):
+    trips = copy_trips(trips)
+    loads = [sum(visit[0].demand for visit in trip) for trip in trips]
+    insertions = {
+        service.service_id: [get_best_insertion(trip, load, service, dist, depot, capacity) for trip, load in zip(trips, loads)]
+        for service in removed
+    }
+    pending = {service.service_id: service for service in removed}
+    new_trip_insertions = {service.service_id: get_best_insertion([], 0, service, dist, depot, capacity) for service in removed}
+
+    while pending:
+        chosen = None
+        chosen_key = None
+
+        for service_id, service in pending.items():
+            options = sorted(
+                (option[0], r) for r, option in enumerate(insertions[service_id]) if option is not None
+            )
+            new_trip = new_trip_insertions[service_id]
+            if new_trip is not None:
+                options.append((new_trip[0], len(trips)))
+                options.sort()
+            if not options:
+                continue
+
+            best_extra, best_trip = options[0]
+            if regret > 1:
+                second = options[1][0] if len(options) > 1 else math.inf
+                key = (-(second - best_extra), best_extra)
+            else:
+                key = (best_extra, 0)
+
+            if chosen_key is None or key < chosen_key:
+                chosen_key = key
+                chosen = (service_id, best_trip)
+
+        if chosen is None:
+            return None
+
+        service_id, r = chosen
+        service = pending.pop(service_id)
+
+        if r == len(trips):
+            trips.append([])
+            loads.append(0)
+            for options in insertions.values():
+                options.append(None)
+
+        _, position, visit = get_best_insertion(trips[r], loads[r], service, dist, depot, capacity)
+        trips[r].insert(position, visit)
+        loads[r] += service.demand
+
+        for other_id, other in pending.items():
+            insertions[other_id][r] = get_best_insertion(trips[r], loads[r], other, dist, depot, capacity)
+
+    return trips
+
+
+def greedy_insertion(trips, removed, dist, depot, capacity):
+    return insert_services(trips, removed, dist, depot, capacity, regret=1)
+
+
+def regret_insertion(trips, removed, dist, depot, capacity):
+    return insert_services(trips, removed, dist, depot, capacity, regret=2)
+
+
+DESTROY_OPERATORS = [random_removal, worst_removal]
+REPAIR_OPERATORS = [greedy_insertion, regret_insertion]
+
+
+def select_operator(weights, rng):
+    return rng.choices(range(len(weights)), weights=weights)[0]
+
+
+# on_improvement(trips, cost, elapsed_seconds) is called with every new best solution.
+# With max_iterations the temperature follows the iteration count and new bests are polished
+# without a time limit, so a seeded run is reproducible; time_limit=None then removes the deadline
+def alns(trips, dist, depot, capacity, time_limit=DEFAULT_TIME_LIMIT, seed=None, on_improvement=None, max_iterations=None):
+    start = perf_counter()
+    deadline = start + time_limit if time_limit is not None else math.inf
+    rng = random.Random(seed)
+
+    current = copy_trips(trips)
+    current_cost = get_trips_cost(current, dist, depot)
+    best = current
+    best_cost = current_cost
+    best_time = 0
+
+    total_services = sum(len(trip) for trip in trips)
+    min_removed = max(1, int(total_services * MIN_REMOVAL_RATIO))
+    max_removed = max(min_removed, min(MAX_REMOVED, int(total_services * MAX_REMOVAL_RATIO)))
+
+    destroy_weights = [1.0] * len(DESTROY_OPERATORS)
+    repair_weights = [1.0] * len(REPAIR_OPERATORS)
+    start_temperature = -START_WORSENING * current_cost / math.log(0.5) if current_cost > 0 else 0
+
+    if on_improvement is not None:
+        on_improvement(best, best_cost, best_time)
+
+    iteration = 0
+
+    while total_services > 0 and perf_counter() < deadline and (max_iterations is None or iteration < max_iterations):
+        iteration += 1
+        d = select_operator(destroy_weights, rng)
+        r = select_operator(repair_weights, rng)
+
+        partial, removed = DESTROY_OPERATORS[d](current, rng.randint(min_removed, max_removed), rng, dist, depot)
+        candidate = REPAIR_OPERATORS[r](partial, removed, dist, depot, capacity)
+        if candidate is None:
+            continue
+        candidate_cost = get_trips_cost(candidate, dist, depot)
+
+        if max_iterations is not None:
+            temperature = start_temperature * (1 - iteration / max_iterations)
+        else:
+            temperature = start_temperature * max(0.0, (deadline - perf_counter()) / time_limit)
+        score = 0
+
+        if candidate_cost < best_cost:
+            if max_iterations is not None:
+                polish_limit = None
+            else:
+                remaining = deadline - perf_counter()
+                polish_limit = min(remaining, 1.0) if remaining > 0 else 0
+            candidate = local_search(candidate, dist, depot, capacity, polish_limit)
+            candidate_cost = get_trips_cost(candidate, dist, depot)
+            best = copy_trips(candidate)
+            best_cost = candidate_cost
+            best_time = perf_counter() - start
+            score = SCORE_BEST
+            if on_improvement is not None:
+                on_improvement(best, best_cost, best_time)
+        elif candidate_cost < current_cost:
+            score = SCORE_BETTER
+        elif temperature > 0 and rng.random() < math.exp((current_cost - candidate_cost) / temperature):
+            score = SCORE_ACCEPTED
+
+        if score:
+            current = candidate
+            current_cost = candidate_cost
+
+        destroy_weights[d] = (1 - REACTION) * destroy_weights[d] + REACTION * score
+        repair_weights[r] = (1 - REACTION) * repair_weights[r] + REACTION * score
+        destroy_weights[d] = max(destroy_weights[d], 0.1)
+        repair_weights[r] = max(repair_weights[r], 0.1)
+
+    return best, best_cost, best_time
+
+
+# on_improvement(routes, total_cost, clocks_to_best) receives node routes, like the solvers return
+def alns_algorithm_from_graph(graph, solver="constructive", time_limit=None, seed=None, on_improvement=None, max_iterations=None):
+    start_total = perf_counter()
+    depot = graph.depot
+
+    trips = [route.get_trip() for route in SOLUTION_BUILDERS[solver](graph)]
+    dist, _ = graph.get_shortest_paths()
+
+    def report(best_trips, best_cost, best_time):
+        if on_improvement is not None:
+            routes = build_routes_from_trips(best_trips, graph)
+            on_improvement(routes, best_cost, int((perf_counter() - start_total) * 1e6))
+
+    search_start = perf_counter()
+    if time_limit is None and max_iterations is not None:
+        remaining = None
+    else:
+        remaining = max((time_limit or DEFAULT_TIME_LIMIT) - (search_start - start_total), 0)
+    trips, total_cost, best_time = alns(trips, dist, depot, graph.capacity, remaining, seed, report, max_iterations)
+
+    routes = build_routes_from_trips(trips, graph)
+    clocks_to_best = int((search_start - start_total + best_time) * 1e6)
+
+    return routes, total_cost, clocks_to_best
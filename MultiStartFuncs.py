@@ -0,0 +1,157 @@
+"""
+Multi-start randomized constructive (GRASP) over a process pool.
+
+The parent computes the all-pairs distances once and places them as a dense matrix in
+shared memory; every worker maps that block read-only instead of receiving a copy.
+Each start builds routes greedily, picking the next service at random from a
+restricted candidate list (RCL): the feasible services whose entry is within
+alpha * (farthest - nearest) of the nearest one. The starts spread alpha evenly from 0
+(nearest service, random ties) up to the given maximum. The cheapest solution is kept.
+"""
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from time import perf_counter
+
+import numpy as np
+
+from SolutionFuncs import build_routes_from_trips, get_routes_cost
+
+DEFAULT_ALPHA = 0.03
+
+# Per-process state: set by the initializer in each worker (or directly when run inline)
+_shared = {}
+
+
+# One array entry per (service, orientation); edges appear twice. service_ids is per service
+def build_service_arrays(graph, services):
+    index_of = graph.to_csr().index_of
+    service_of, entries, exits = [], [], []
+
+    for position, service in enumerate(services):
+        for entry, exit in service.get_orientations():
+            service_of.append(position)
+            entries.append(index_of[entry])
+            exits.append(index_of[exit])
+
+    return {
+        "service_of": np.array(service_of, dtype=np.int32),
+        "entries": np.array(entries, dtype=np.int32),
+        "exits": np.array(exits, dtype=np.int32),
+        "demands": np.array([services[i].demand for i in service_of], dtype=np.int64),
+        "service_costs": np.array([services[i].service_cost for i in service_of], dtype=np.float64),
+        "service_ids": np.array([service.service_id for service in services], dtype=np.int64),
+    }
+
+
+def _init_worker(shm_name, shape, arrays, depot, capacity, total_services):
+    memory = shared_memory.SharedMemory(name=shm_name)
+    _shared["memory"] = memory
+    _shared["matrix"] = np.ndarray(shape, dtype=np.float64, buffer=memory.buf)
+    _shared["arrays"] = arrays
+    _shared["depot"] = depot
+    _shared["capacity"] = capacity
+    _shared["total_services"] = total_services
+
+
+# Randomized greedy; returns (cost, trips of (service position, orientation array index)).
+# Raises ValueError like build_constructive_solution when a service or the depot cannot be reached
+def randomized_construction(seed, alpha):
+    matrix = _shared["matrix"]
+    arrays = _shared["arrays"]
+    depot = _shared["depot"]
+    capacity = _shared["capacity"]
+    service_of = arrays["service_of"]
+    entries = arrays["entries"]
+    exits = arrays["exits"]
+    demands = arrays["demands"]
+
+    rng = np.random.default_rng(seed)
+    unserved = np.ones(_shared["total_services"], dtype=bool)
+    trips = []
+    total_cost = 0.0
+
+    while unserved.any():
+        remaining_capacity = capacity
+        last_node = depot
+        trip = []
+
+        while True:
+            distances = matrix[last_node, entries].copy()
+            distances[~unserved[service_of] | (demands > remaining_capacity)] = np.inf
+            nearest = distances.min()
+            if nearest == np.inf:
+                break
+
+            farthest = distances[np.isfinite(distances)].max()
+            candidates = np.flatnonzero(distances <= nearest + alpha * (farthest - nearest))
+            chosen = int(candidates[rng.integers(len(candidates))])
+
+            total_cost += distances[chosen] + arrays["service_costs"][chosen]
+            unserved[service_of[chosen]] = False
+            remaining_capacity -= demands[chosen]
+            last_node = exits[chosen]
+            trip.append((int(service_of[chosen]), chosen))
+
+        if not trip:
+            unserved = arrays["service_ids"][unserved].tolist()
+            raise ValueError(f"{len(unserved)} services cannot be served from the depot (unreachable or demand above capacity {capacity}): {unserved[:10]}")
+        if matrix[last_node, depot] == np.inf:
+            raise ValueError(f"no path back to the depot after service {arrays['service_ids'][trip[-1][0]]}")
+
+        total_cost += matrix[last_node, depot]
+        trips.append(trip)
+
+    return total_cost, trips
+
+
+def multi_start_construction(graph, starts, workers=None, seed=None, alpha=DEFAULT_ALPHA):
+    services = graph.get_required_services()
+    csr = graph.to_csr()
+
+    matrix = graph.get_distance_matrix()
+    arrays = build_service_arrays(graph, services)
+    base_seed = seed if seed is not None else int.from_bytes(os.urandom(4), "little")
+    jobs = [(base_seed + i, alpha * i / max(starts - 1, 1)) for i in range(starts)]
+
+    memory = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    try:
+        shared_matrix = np.ndarray(matrix.shape, dtype=np.float64, buffer=memory.buf)
+        shared_matrix[:] = matrix
+        init_args = (memory.name, shared_matrix.shape, arrays, csr.index_of[graph.depot], graph.capacity, len(services))
+
+        if workers == 1 or starts == 1:
+            _init_worker(*init_args)
+            results = [randomized_construction(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=init_args) as executor:
+                results = list(executor.map(randomized_construction, *zip(*jobs)))
+    finally:
+        if "memory" in _shared:
+            _shared.pop("memory").close()
+            _shared.clear()
+        memory.close()
+        memory.unlink()
+
+    _, best_trips = min(results, key=lambda result: result[0])
+
+    # Back to (service, entry, exit) trips over the original node ids
+    node_ids = csr.node_ids.tolist()
+    return [
+        [(services[s], node_ids[arrays["entries"][o]], node_ids[arrays["exits"][o]]) for s, o in trip]
+        for trip in best_trips
+    ]
+
+
+def multi_start_algorithm_from_graph(graph, starts, workers=None, seed=None, alpha=DEFAULT_ALPHA):
+    start_total = perf_counter()
+
+    trips = multi_start_construction(graph, starts, workers, seed, alpha)
+    routes = build_routes_from_trips(trips, graph)
+    total_cost = get_routes_cost(routes)
+
+    end_total = perf_counter()
+    clocks_used = int((end_total - start_total) * 1e6)
+
+    return routes, total_cost, clocks_used
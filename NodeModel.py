@@ -8,6 +8,8 @@ Node model:
 from ConnectionModel import Connection
 
 class Node:
+    __slots__ = ("node_id", "connections")
+
     def __init__(self, node_id):
         self.node_id = node_id
         self.connections = []
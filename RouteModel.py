@@ -0,0 +1,46 @@
+"""
+Route model:
+    {
+        depot: NodeId,
+        nodes: NodeId Array (walk from the depot, ending at the depot once closed),
+        visits: List[Tuple[Service, entry, exit]] (services in the order they are served),
+        load: Int,
+        deadhead_cost: Int,
+        service_cost: Int
+    }
+Load and costs are running sums, updated as the route grows.
+"""
+
+class Route:
+    def __init__(self, depot):
+        self.depot = depot
+        self.nodes = [depot]
+        self.visits = []
+        self.load = 0
+        self.deadhead_cost = 0
+        self.service_cost = 0
+
+    def get_last_node(self):
+        return self.nodes[-1]
+
+    # path starts at the current last node
+    def add_deadhead(self, path, cost):
+        self.nodes.extend(path[1:])
+        self.deadhead_cost += cost
+
+    # The route must already be at entry; serving a link moves it to exit
+    def add_service(self, service, entry, exit):
+        if exit != entry:
+            self.nodes.append(exit)
+        self.visits.append((service, entry, exit))
+        self.load += service.demand
+        self.service_cost += service.service_cost
+
+    def get_total_cost(self):
+        return self.deadhead_cost + self.service_cost
+
+    def get_trip(self):
+        return list(self.visits)
+
+    def __repr__(self):
+        return f"{{'load': {self.load}, 'deadhead_cost': {self.deadhead_cost}, 'service_cost': {self.service_cost}, 'visits': {len(self.visits)}}}"
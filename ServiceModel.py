@@ -0,0 +1,31 @@
+"""
+Service model:
+    {
+        service_id: Int (same numbering as build_service_mapping),
+        service_type: "N" | "E" | "A" (Node, Edge or Arc),
+        origin: NodeId,
+        destiny: NodeId (same as origin for nodes),
+        demand: Int,
+        traversal_cost: Int (0 for nodes),
+        service_cost: Int
+    }
+"""
+
+class Service:
+    def __init__(self, service_id, service_type, origin, destiny, demand, traversal_cost = 0, service_cost = 0):
+        self.service_id = service_id
+        self.service_type = service_type
+        self.origin = origin
+        self.destiny = destiny
+        self.demand = demand
+        self.traversal_cost = traversal_cost
+        self.service_cost = service_cost
+
+    # (entry, exit) pairs the service can be performed in; edges work both ways
+    def get_orientations(self):
+        if self.service_type == "E":
+            return [(self.origin, self.destiny), (self.destiny, self.origin)]
+        return [(self.origin, self.destiny)]
+
+    def __repr__(self):
+        return f"{{'service_id': {self.service_id}, 'service_type': {self.service_type}, 'origin': {self.origin}, 'destiny': {self.destiny}, 'demand': {self.demand}, 'service_cost': {self.service_cost}}}"
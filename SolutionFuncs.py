@@ -1,131 +1,238 @@
+import heapq
+import math
+
 from time import perf_counter
 
-def dijkstra_shortest_path(graph, start, end):
-    import heapq
-    queue = [(0, start, [start])]
-    visited = set()
+from GraphModel import dijkstra, reconstruct_dijkstra_path
+from RouteModel import Route
 
-    while queue:
-        cost, node, path = heapq.heappop(queue)
-        if node == end:
-            return path
+# Multi-target Dijkstra: settles nodes by distance from start and stops at the first
+# node holding an unserved service that fits the remaining capacity
+def dijkstra_nearest_service(graph, start, services_by_node, remaining_capacity):
+    dist = {start: 0}
+    pred = {start: None}
+    queue = [(0, start)]
 
-        if node in visited:
+    while queue:
+        cost, node = heapq.heappop(queue)
+        if cost > dist[node]:
             continue
-        visited.add(node)
+
+        for visit in services_by_node.get(node, {}).values():
+            if visit[0].demand <= remaining_capacity:
+                return reconstruct_dijkstra_path(pred, node), visit, cost
 
         for conn in graph.adj_list[node].connections:
-            if conn.destiny not in visited:
-                heapq.heappush(queue, (cost + conn.traversal_cost, conn.destiny, path + [conn.destiny]))
-    return None
+            new_cost = cost + conn.traversal_cost
+            if new_cost < dist.get(conn.destiny, math.inf):
+                dist[conn.destiny] = new_cost
+                pred[conn.destiny] = node
+                heapq.heappush(queue, (new_cost, conn.destiny))
 
-def calculate_path_cost(graph, path):
-    cost = 0
-    for i in range(len(path) - 1):
-        origin = path[i]
-        dest = path[i + 1]
-        for conn in graph.adj_list[origin].connections:
-            if conn.destiny == dest:
-                cost += conn.traversal_cost
-                break
-    return cost
+    return None
 
-def constructive_algorithm_from_graph(graph):
-    start_total = perf_counter()
+# Greedy nearest-service construction, returns the list of routes. Raises ValueError when
+# some service cannot be served from the depot (unreachable, or demand above capacity) or
+# a route cannot return to the depot
+def build_constructive_solution(graph):
     depot = graph.depot
     capacity = graph.capacity
 
-    required_services = {
-        "N": {n: {"demand": 1, "served": False} for n in graph.required_nodes},
-        "E": {
-            frozenset((u, v)): {
-                "from": u, "to": v,
-                "demand": next(c.demand for c in graph.adj_list[u].connections if c.destiny == v and c.connection_type == "E"),
-                "served": False
-            } for u, v in graph.required_edges
-        },
-        "A": {
-            (u, v): {
-                "from": u, "to": v,
-                "demand": next(c.demand for c in graph.adj_list[u].connections if c.destiny == v and c.connection_type == "A"),
-                "served": False
-            } for u, v in graph.required_arcs
-        }
-    }
+    # Unserved services indexed by the node they are entered from (both ends for edges);
+    # served ones are removed
+    services_by_node = {}
+    for service in graph.get_required_services():
+        for entry, exit in service.get_orientations():
+            services_by_node.setdefault(entry, {})[service.service_id] = (service, entry, exit)
 
     routes = []
-    total_cost = 0
 
-    while any(not s["served"] for svc in required_services.values() for s in svc.values()):
-        route = [depot]
-        remaining_capacity = capacity
-        last_node = depot
-        service_added = False
+    while services_by_node:
+        route = Route(depot)
 
         while True:
-            best_service = None
-            best_path = None
-            best_cost = float("inf")
-            best_type = None
-
-            for s_type, services in required_services.items():
-                for sid, s in services.items():
-                    if s["served"] or s["demand"] > remaining_capacity:
-                        continue
-                    target = s["from"] if s_type in ["E", "A"] else sid
-                    path = dijkstra_shortest_path(graph, last_node, target)
-                    if path:
-                        cost = calculate_path_cost(graph, path)
-                        if cost < best_cost:
-                            best_cost = cost
-                            best_service = sid
-                            best_path = path
-                            best_type = s_type
-                            total_cost += best_cost
-
-            if not best_service:
+            nearest = dijkstra_nearest_service(graph, route.get_last_node(), services_by_node, capacity - route.load)
+
+            if nearest is None:
+                break
+
+            path, (service, entry, exit), cost = nearest
+
+            for orientation_entry, _ in service.get_orientations():
+                entry_services = services_by_node[orientation_entry]
+                del entry_services[service.service_id]
+                if not entry_services:
+                    del services_by_node[orientation_entry]
+
+            route.add_deadhead(path, cost)
+            route.add_service(service, entry, exit)
+
+        if not route.visits:
+            unserved = sorted({visit[0].service_id for visits in services_by_node.values() for visit in visits.values()})
+            raise ValueError(f"{len(unserved)} services cannot be served from the depot (unreachable or demand above capacity {capacity}): {unserved[:10]}")
+
+        if route.get_last_node() != depot:
+            dist, pred = dijkstra(graph, route.get_last_node(), {depot})
+            if depot not in pred:
+                raise ValueError(f"no path back to the depot from node {route.get_last_node()}")
+            route.add_deadhead(reconstruct_dijkstra_path(pred, depot), dist[depot])
+
+        routes.append(route)
+
+    return routes
+
+def get_routes_cost(routes):
+    return sum(route.get_total_cost() for route in routes)
+
+def constructive_algorithm_from_graph(graph):
+    start_total = perf_counter()
+
+    routes = build_constructive_solution(graph)
+    total_cost = get_routes_cost(routes)
+
+    end_total = perf_counter()
+    clocks_used = int((end_total - start_total) * 1e6)
+
+    return routes, total_cost, clocks_used
+
+# Path-scanning giant tour: from the current end, go to the nearest unserved service
+# (ties broken by the farthest return to the depot), choosing the orientation of edges.
+# Returns a list of (service, entry, exit); raises ValueError if some service cannot be reached
+def path_scanning_giant_tour(services, dist, depot):
+    remaining = list(services)
+    tour = []
+    last_node = depot
+
+    while remaining:
+        dist_from_last = dist[last_node]
+        best = None
+        best_key = (math.inf, 0)
+
+        for i, s in enumerate(remaining):
+            for entry, exit in s.get_orientations():
+                if entry not in dist_from_last or depot not in dist[exit]:
+                    continue
+                key = (dist_from_last[entry], -dist[exit][depot])
+                if key < best_key:
+                    best_key = key
+                    best = (i, entry, exit)
+
+        if best is None:
+            unserved = sorted(s.service_id for s in remaining)
+            raise ValueError(f"{len(unserved)} services unreachable from node {last_node}: {unserved[:10]}")
+
+        i, entry, exit = best
+        tour.append((remaining[i], entry, exit))
+        remaining[i] = remaining[-1]
+        remaining.pop()
+        last_node = exit
+
+    return tour
+
+# Ulusoy split: Bellman-style DP over the giant tour, where cost[j] is the cheapest way
+# to serve the first j services with capacity-feasible trips that start and end at the depot.
+# Raises ValueError when no such split exists (a service whose demand exceeds the capacity)
+def ulusoy_split(tour, dist, depot, capacity):
+    total = len(tour)
+    cost = [0] + [math.inf] * total
+    split_from = [0] * (total + 1)
+
+    for i in range(total):
+        if cost[i] == math.inf:
+            continue
+
+        load = 0
+        trip_cost = 0
+
+        for j in range(i, total):
+            service, entry, exit = tour[j]
+            load += service.demand
+            if load > capacity:
                 break
 
-            for node in best_path[1:]:
-                if route[-1] != node:
-                    route.append(node)
-            last_node = route[-1]
-            service_added = True
-
-            if best_type == "N":
-                remaining_capacity -= 1
-                required_services["N"][best_service]["served"] = True
-
-            elif best_type == "E":
-                u, v = tuple(best_service)
-                next_node = v if last_node == u else u
-                if route[-1] != next_node:
-                    route.append(next_node)
-                remaining_capacity -= required_services["E"][best_service]["demand"]
-                required_services["E"][best_service]["served"] = True
-                last_node = next_node
-
-            elif best_type == "A":
-                u, v = best_service
-                if route[-1] != v:
-                    route.append(v)
-                remaining_capacity -= required_services["A"][best_service]["demand"]
-                required_services["A"][best_service]["served"] = True
-                last_node = v
-
-        if last_node != depot:
-            back_path = dijkstra_shortest_path(graph, last_node, depot)
-            if back_path:
-                for node in back_path[1:]:
-                    if route[-1] != node:
-                        route.append(node)
-
-        if service_added:
-            routes.append(route)
-        else:
-            break
+            if j == i:
+                trip_cost = dist[depot][entry] + service.service_cost
+            else:
+                trip_cost += dist[tour[j - 1][2]][entry] + service.service_cost
+
+            candidate = cost[i] + trip_cost + dist[exit][depot]
+            if candidate < cost[j + 1]:
+                cost[j + 1] = candidate
+                split_from[j + 1] = i
+
+    if cost[total] == math.inf:
+        unsplit = next(j for j in range(total) if cost[j + 1] == math.inf)
+        service = tour[unsplit][0]
+        raise ValueError(f"no capacity-feasible split: service {service.service_id} has demand {service.demand}, capacity {capacity}")
+
+    trips = []
+    j = total
+    while j > 0:
+        i = split_from[j]
+        trips.append(tour[i:j])
+        j = i
+    trips.reverse()
+
+    return trips, cost[total]
+
+# Builds a Route from a trip of (service, entry, exit), deadheading along shortest paths
+def build_route_from_trip(trip, dist, pred, depot):
+    route = Route(depot)
+
+    for service, entry, exit in trip:
+        last_node = route.get_last_node()
+        route.add_deadhead(reconstruct_dijkstra_path(pred[last_node], entry), dist[last_node][entry])
+        route.add_service(service, entry, exit)
+
+    last_node = route.get_last_node()
+    route.add_deadhead(reconstruct_dijkstra_path(pred[last_node], depot), dist[last_node][depot])
+
+    return route
+
+def build_routes_from_trips(trips, graph):
+    dist, pred = graph.get_shortest_paths()
+    return [build_route_from_trip(trip, dist, pred, graph.depot) for trip in trips]
+
+# Route-first, cluster-second: giant tour by path scanning, then Ulusoy split
+def build_split_solution(graph):
+    depot = graph.depot
+    dist, _ = graph.get_shortest_paths()
+
+    tour = path_scanning_giant_tour(graph.get_required_services(), dist, depot)
+    trips, _ = ulusoy_split(tour, dist, depot, graph.capacity)
+
+    return build_routes_from_trips(trips, graph)
+
+def split_algorithm_from_graph(graph):
+    start_total = perf_counter()
+
+    routes = build_split_solution(graph)
+    total_cost = get_routes_cost(routes)
 
     end_total = perf_counter()
     clocks_used = int((end_total - start_total) * 1e6)
 
-    return routes, total_cost, clocks_used
\ No newline at end of file
+    return routes, total_cost, clocks_used
+
+# Cost of trips of (service, entry, exit): deadheading between services plus their service cost
+def get_trips_cost(trips, dist, depot):
+    total_cost = 0
+
+    for trip in trips:
+        last_node = depot
+        for service, entry, exit in trip:
+            total_cost += dist[last_node][entry] + service.service_cost
+            last_node = exit
+        total_cost += dist[last_node][depot]
+
+    return total_cost
+
+SOLUTION_BUILDERS = {
+    "constructive": build_constructive_solution,
+    "split": build_split_solution,
+}
+
+SOLVERS = {
+    "constructive": constructive_algorithm_from_graph,
+    "split": split_algorithm_from_graph,
+}
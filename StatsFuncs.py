@@ -0,0 +1,113 @@
+"""
+Batch graph statistics over instance files, one flat row per instance.
+
+Each worker parses one instance, computes Graph.compute_all_stats() and sends back a
+row of scalars only. Components, degrees and betweenness centrality are summarized:
+    {
+        "instance": String,
+        "family": String,
+        "status": "ok" | "error",
+        "vertexes" ... "diameter": Number (one column per scalar stat),
+        "components": Int, "largest_component": Int,
+        "degree_mean", "edge_degree_mean", "arc_degree_mean": Float,
+        "betweenness_max", "betweenness_mean", "betweenness_p50", "betweenness_p90", "betweenness_p99": Float,
+        "stats_seconds": Float,
+        "error": Optional[String]
+    }
+The rows are written as CSV, or as Parquet when the output ends with .parquet (needs pyarrow
+or fastparquet; check has_parquet_engine before computing the rows).
+"""
+import importlib.util
+import os
+
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from AuxFuncs import read_dat_to_graph, list_dat_files, INSTANCE_FAMILIES
+
+from BatchFuncs import run_in_pool
+
+DEFAULT_STATS_OUTPUT = os.path.join("stats", "graph_stats.csv")
+
+BETWEENNESS_PERCENTILES = (50, 90, 99)
+
+# Engines pandas can write Parquet with
+PARQUET_ENGINES = ("pyarrow", "fastparquet")
+
+
+def get_instance_family(filename):
+    return next((family for family in INSTANCE_FAMILIES if filename.startswith(family)), "")
+
+
+def summarize_stats(stats):
+    components = stats["connected_components"]
+    degrees = stats["degree_distributions"]
+    centrality = np.fromiter(stats["betweenness_centrality"].values(), dtype=np.float64)
+    if len(centrality) == 0:
+        centrality = np.zeros(1)
+
+    return {
+        "vertexes": stats["total_of_vertexes"],
+        "edges": stats["total_of_edges"],
+        "arcs": stats["total_of_arcs"],
+        "required_vertexes": stats["required_vertexes"],
+        "required_edges": stats["required_edges"],
+        "required_arcs": stats["required_arcs"],
+        "order_strength": stats["order_strength"],
+        "components": len(components),
+        "largest_component": max((len(component) for component in components), default=0),
+        "min_degree": stats["min_degree"],
+        "max_degree": stats["max_degree"],
+        "degree_mean": degrees["all"]["mean"],
+        "edge_degree_mean": degrees["E"]["mean"],
+        "arc_degree_mean": degrees["A"]["mean"],
+        "betweenness_max": float(centrality.max()),
+        "betweenness_mean": float(centrality.mean()),
+        **{f"betweenness_p{percentile}": float(np.percentile(centrality, percentile)) for percentile in BETWEENNESS_PERCENTILES},
+        "average_path_length": stats["average_path_length"],
+        "diameter": stats["diameter"],
+    }
+
+
+# Runs inside the worker. betweenness_samples limits Brandes to that many sampled sources
+def compute_instance_stats(filename, betweenness_samples=None):
+    start = perf_counter()
+    row = {"instance": filename, "family": get_instance_family(filename), "status": "ok"}
+
+    try:
+        graph, _ = read_dat_to_graph(filename)
+        row.update(summarize_stats(graph.compute_all_stats(betweenness_samples, seed=0)))
+    except Exception as error:
+        row.update({"status": "error", "error": repr(error)})
+
+    row["stats_seconds"] = perf_counter() - start
+    return row
+
+
+# Yields one row per instance as soon as it finishes
+def run_stats_batch(filenames=None, workers=None, betweenness_samples=None):
+    if filenames is None:
+        filenames = list_dat_files(order="largest_first")
+
+    jobs = [(filename, betweenness_samples) for filename in filenames]
+    yield from run_in_pool(compute_instance_stats, jobs, workers)
+
+
+def has_parquet_engine():
+    return any(importlib.util.find_spec(engine) is not None for engine in PARQUET_ENGINES)
+
+
+def write_stats_table(rows, output_path=DEFAULT_STATS_OUTPUT):
+    table = pd.DataFrame(rows).sort_values("instance")
+    folder = os.path.dirname(output_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    if output_path.endswith(".parquet"):
+        table.to_parquet(output_path, index=False)
+    else:
+        table.to_csv(output_path, index=False)
+
+    return table
@@ -0,0 +1,179 @@
+"""
+Validation of sol-*.dat files against their instances.
+
+Each route line lists its visits as (D 0,1,1) depot markers and (S id,entry,exit)
+services. A solution is valid when:
+    - every route starts and ends at the depot marker;
+    - every visit is a required service performed in one of its orientations;
+    - every required service is served exactly once over all routes;
+    - every route respects the capacity and reports its real load;
+    - every route can go from the depot through its visits and back (continuity), and
+      the reported route and total costs match the recomputed ones (shortest deadheads
+      between consecutive visits plus the service costs).
+One result per file:
+    {
+        "instance": String,
+        "status": "valid" | "invalid" | "error",
+        "routes": Int,
+        "reported_cost": Int,
+        "computed_cost": Int,
+        "errors": List[String] (at most MAX_ERRORS)
+    }
+"""
+import math
+import os
+
+from AuxFuncs import read_dat_to_graph, SOLUTIONS_FOLDER
+
+from BatchFuncs import run_in_pool
+
+DEPOT_MARKER = ("D", 0, 1, 1)
+
+MAX_ERRORS = 20
+
+
+# Returns (header values, routes); each route is {route_id, load, cost, visits: [(kind, id, entry, exit)]}
+def parse_solution_file(filepath):
+    with open(filepath) as file:
+        lines = [line for line in file.read().splitlines() if line.strip()]
+
+    header = [int(value) for value in lines[:4]]
+    routes = []
+
+    for line in lines[4:]:
+        head, _, body = line.partition("(")
+        fields = head.split()
+        visits = []
+        for triplet in ("(" + body).split(")"):
+            triplet = triplet.strip().lstrip("(")
+            if not triplet:
+                continue
+            kind, values = triplet.split(" ", 1)
+            service_id, entry, exit = (int(value) for value in values.split(","))
+            visits.append((kind, service_id, entry, exit))
+
+        routes.append({
+            "route_id": int(fields[2]),
+            "load": int(fields[3]),
+            "cost": int(fields[4]),
+            "visits": visits,
+        })
+
+    return header, routes
+
+
+def validate_solution(graph, header, routes):
+    errors = []
+    services = {service.service_id: service for service in graph.get_required_services()}
+    csr = graph.to_csr()
+    index_of = csr.index_of
+    depot = graph.depot
+    distances = {}
+
+    def distance(u, v):
+        if u not in distances:
+            distances[u], _ = csr.dijkstra(index_of[u])
+        return distances[u][index_of[v]]
+
+    total_cost, total_routes = header[0], header[1]
+    if total_routes != len(routes):
+        errors.append(f"header lists {total_routes} routes, file has {len(routes)}")
+
+    served = {}
+    computed_total = 0
+
+    for route in routes:
+        route_id = route["route_id"]
+        visits = route["visits"]
+
+        if len(visits) < 2 or visits[0] != DEPOT_MARKER or visits[-1] != DEPOT_MARKER:
+            errors.append(f"route {route_id}: does not start and end at the depot")
+        inner = [visit for visit in visits if visit[0] != "D"]
+        if len(inner) != len(visits) - 2:
+            errors.append(f"route {route_id}: depot marker inside the route")
+
+        load = 0
+        cost = 0
+        position = depot
+
+        for kind, service_id, entry, exit in inner:
+            service = services.get(service_id)
+            if kind != "S" or service is None:
+                errors.append(f"route {route_id}: unknown visit ({kind} {service_id},{entry},{exit})")
+                continue
+            if (entry, exit) not in service.get_orientations():
+                errors.append(f"route {route_id}: service {service_id} performed as ({entry},{exit})")
+                continue
+
+            served.setdefault(service_id, []).append(route_id)
+            load += service.demand
+
+            deadhead = float(distance(position, entry))
+            if deadhead == math.inf:
+                errors.append(f"route {route_id}: no path from {position} to service {service_id}")
+            cost += deadhead + service.service_cost
+            position = exit
+
+        back = float(distance(position, depot))
+        if back == math.inf:
+            errors.append(f"route {route_id}: no path back to the depot from {position}")
+        cost += back
+
+        if load > graph.capacity:
+            errors.append(f"route {route_id}: load {load} exceeds capacity {graph.capacity}")
+        if load != route["load"]:
+            errors.append(f"route {route_id}: reported load {route['load']}, actual {load}")
+        if cost != route["cost"]:
+            errors.append(f"route {route_id}: reported cost {route['cost']}, recomputed {cost:g}")
+        computed_total += cost
+
+    for service_id, route_ids in served.items():
+        if len(route_ids) > 1:
+            errors.append(f"service {service_id} served {len(route_ids)} times (routes {route_ids})")
+    missing = sorted(set(services) - set(served))
+    if missing:
+        errors.append(f"{len(missing)} services not served: {missing[:10]}")
+
+    if computed_total != total_cost:
+        errors.append(f"reported total cost {total_cost}, recomputed {computed_total:g}")
+
+    return computed_total, errors
+
+
+# Runs inside the worker
+def validate_solution_file(filepath):
+    filename = os.path.basename(filepath)
+    instance = filename[len("sol-"):] if filename.startswith("sol-") else filename
+    result = {"instance": instance, "status": "valid"}
+
+    try:
+        graph, _ = read_dat_to_graph(instance)
+        header, routes = parse_solution_file(filepath)
+        computed_cost, errors = validate_solution(graph, header, routes)
+    except Exception as error:
+        result.update({"status": "error", "errors": [repr(error)]})
+        return result
+
+    result.update({
+        "status": "invalid" if errors else "valid",
+        "routes": len(routes),
+        "reported_cost": header[0],
+        "computed_cost": int(computed_cost) if computed_cost != math.inf else None,
+        "errors": errors[:MAX_ERRORS],
+    })
+    return result
+
+
+def list_solution_files(folder=SOLUTIONS_FOLDER):
+    return sorted(
+        os.path.join(folder, name) for name in os.listdir(folder)
+        if name.startswith("sol-") and name.endswith(".dat")
+    )
+
+
+# Yields one result per solution file as soon as it is checked
+def run_validation(filepaths=None, workers=None):
+    if filepaths is None:
+        filepaths = list_solution_files()
+
+    yield from run_in_pool(validate_solution_file, [(filepath,) for filepath in filepaths], workers)
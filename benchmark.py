@@ -0,0 +1,104 @@
+"""
+Benchmark entry point: times solver configurations over the instances and compares result files
+
+    python benchmark.py run --solver constructive --solver split --family BHW
+    python benchmark.py compare benchmarks/base.json benchmarks/results.json
+"""
+
+import argparse
+import sys
+
+from AuxFuncs import list_dat_files, INSTANCE_FAMILIES
+
+from BenchmarkFuncs import (
+    run_benchmark, write_benchmark_results, read_benchmark_results, compare_benchmarks, get_benchmark_meta,
+    DEFAULT_BENCHMARK_OUTPUT, DEFAULT_TIME_THRESHOLD, DEFAULT_COST_THRESHOLD,
+)
+
+from SolutionFuncs import SOLVERS
+
+
+def run(args):
+    configs = [
+        {
+            "solver": solver,
+            "local_search": args.local_search,
+            "time_limit": args.time_limit,
+            "metaheuristic": args.metaheuristic,
+            "seed": args.seed,
+            "max_iterations": args.max_iterations,
+            "starts": args.starts,
+        }
+        for solver in args.solver or ["constructive"]
+    ]
+    filenames = list_dat_files(args.pattern, args.family, order="largest_first")
+    rows = []
+
+    for row in run_benchmark(configs, filenames, args.workers, args.warmup, args.repeats, not args.no_cache):
+        rows.append(row)
+        if row["status"] == "ok":
+            print(f"{row['instance']} [{row['config']}]: solve {row['solve_seconds']:.4f}s, objective {row['objective']}, peak RSS {row['peak_rss_kb']} KB")
+        else:
+            print(f"{row['instance']} [{row['config']}]: {row['status']} {row.get('error', '')}".rstrip())
+
+    write_benchmark_results(rows, args.output, get_benchmark_meta(args.warmup, args.repeats, args.workers))
+
+
+def compare(args):
+    comparisons = compare_benchmarks(
+        read_benchmark_results(args.base), read_benchmark_results(args.new), args.time_threshold, args.cost_threshold
+    )
+    regressions = 0
+
+    for comparison in comparisons:
+        flags = [name for name in ("time", "cost") if comparison[f"{name}_regression"]]
+        regressions += bool(flags)
+        print(
+            f"{comparison['instance']} [{comparison['config']}]: "
+            f"solve {comparison['base_solve_seconds']:.4f}s -> {comparison['new_solve_seconds']:.4f}s ({comparison['time_ratio']:.2f}x), "
+            f"objective {comparison['base_objective']} -> {comparison['new_objective']}"
+            + (f"  REGRESSION ({', '.join(flags)})" if flags else "")
+        )
+
+    print(f"{len(comparisons)} compared, {regressions} regressions")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark solvers over the instances in selected_instances")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="time solver configurations and write a results file")
+    run_parser.add_argument("--solver", action="append", choices=SOLVERS, help="solver to benchmark (repeatable, default: constructive)")
+    run_parser.add_argument("--local-search", choices=["first", "best"], default=None, help="add a local search phase (first or best improvement)")
+    run_parser.add_argument("--metaheuristic", choices=["alns"], default=None, help="add an adaptive large neighborhood search phase")
+    run_parser.add_argument("--time-limit", type=float, default=None, help="time budget in seconds for the improvement phase")
+    run_parser.add_argument("--seed", type=int, default=0, help="random seed for the metaheuristic (default: 0)")
+    run_parser.add_argument("--max-iterations", type=int, default=None, help="iteration budget for the metaheuristic, for reproducible objectives")
+    run_parser.add_argument("--starts", type=int, default=1, help="randomized constructive runs, keeping the best (constructive only)")
+    run_parser.add_argument("--warmup", type=int, default=1, help="untimed runs per instance before timing (default: 1)")
+    run_parser.add_argument("--repeats", type=int, default=3, help="timed runs per instance (default: 3)")
+    run_parser.add_argument("--workers", type=int, default=1, help="instances benchmarked at once (default: 1, for stable timings)")
+    run_parser.add_argument("--no-cache", action="store_true", help="parse the .dat text every time instead of the parse cache")
+    run_parser.add_argument("--pattern", default="*.dat", help="glob filter on instance file names")
+    run_parser.add_argument("--family", action="append", choices=INSTANCE_FAMILIES, help="instance family filter (repeatable)")
+    run_parser.add_argument("--output", default=DEFAULT_BENCHMARK_OUTPUT, help=f"results file, .json or .csv (default: {DEFAULT_BENCHMARK_OUTPUT})")
+
+    compare_parser = commands.add_parser("compare", help="diff two results files and flag regressions")
+    compare_parser.add_argument("base", help="baseline results file")
+    compare_parser.add_argument("new", help="results file to check against the baseline")
+    compare_parser.add_argument("--time-threshold", type=float, default=DEFAULT_TIME_THRESHOLD, help=f"flag solve time increases above this ratio (default: {DEFAULT_TIME_THRESHOLD})")
+    compare_parser.add_argument("--cost-threshold", type=float, default=DEFAULT_COST_THRESHOLD, help=f"flag objective increases above this ratio (default: {DEFAULT_COST_THRESHOLD})")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        if args.starts > 1 and (any(solver != "constructive" for solver in args.solver or []) or args.local_search or args.metaheuristic):
+            run_parser.error("--starts only applies to the constructive solver without an improvement phase")
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
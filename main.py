@@ -4,39 +4,146 @@ Main function to start the application
 Author: Lucas Scommegna
 """
 
-from AuxFuncs import read_dat_to_graph, export_solution_to_dat, build_service_mapping, read_all_dat_files_to_graphs
+import argparse
+import fnmatch
+import os
+import sys
 
-from SolutionFuncs import constructive_algorithm_from_graph
+from AuxFuncs import read_dat_to_graph, export_solution_to_dat, write_combined_solutions, list_dat_files, INSTANCE_FAMILIES, SOLUTIONS_FOLDER
 
-from time import perf_counter
-
-start_total = perf_counter()
-
-solution_method = input("Select solution method. To generate solution for all data or one file: (all/one)")
-
-if solution_method == "one":
-    filepath = input("Type the filename: ")
-    graph, input_data = read_dat_to_graph(filepath)
+from BatchFuncs import run_batch, solve_graph, make_incumbent_exporter, get_instrumentation_context, save_instrumentation_report
 
-    routes, total_cost, clocks_used  = constructive_algorithm_from_graph(graph)
+from InstrumentationFuncs import DEFAULT_INSTRUMENTATION_FOLDER
 
-    service_mapping = build_service_mapping(input_data)
+from ValidationFuncs import run_validation, list_solution_files
 
-    end_total = perf_counter()
+from StatsFuncs import run_stats_batch, write_stats_table, has_parquet_engine, DEFAULT_STATS_OUTPUT
 
-    total_clocks = int((end_total - start_total) * 1e6)
+from SolutionFuncs import SOLVERS
 
-    export_solution_to_dat(filepath, routes, service_mapping, total_cost, total_clocks, clocks_used, graph)
-else:
-    graph_array = read_all_dat_files_to_graphs()
-
-    for graph, input_data, filepath in graph_array:
-        routes, total_cost, clocks_used = constructive_algorithm_from_graph(graph)
-        service_mapping = build_service_mapping(input_data)
-
-        end_total = perf_counter()
-
-        total_clocks = int((end_total - start_total) * 1e6)
+from time import perf_counter
 
-        export_solution_to_dat(filepath, routes, service_mapping, total_cost, total_clocks, clocks_used, graph)
 
+def main():
+    parser = argparse.ArgumentParser(description="Generate solutions for the instances in selected_instances")
+    parser.add_argument("mode", nargs="?", choices=["all", "one", "stats", "validate"], help="solve all instances or a single file, write graph stats for all instances, or validate the solution files")
+    parser.add_argument("filename", nargs="?", help="instance file name, used with 'one'")
+    parser.add_argument("--solver", choices=SOLVERS, default="constructive", help="solution method (default: constructive)")
+    parser.add_argument("--local-search", choices=["first", "best"], default=None, help="improve the solution with local search (first or best improvement)")
+    parser.add_argument("--metaheuristic", choices=["alns"], default=None, help="improve the solution with adaptive large neighborhood search")
+    parser.add_argument("--time-limit", type=float, default=None, help="time budget in seconds for the improvement phase")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for the metaheuristic")
+    parser.add_argument("--max-iterations", type=int, default=None, help="iteration budget for the metaheuristic; with --seed the run is reproducible (no time limit unless --time-limit is given)")
+    parser.add_argument("--starts", type=int, default=1, help="number of randomized constructive runs, keeping the best")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes: instances for 'all' and 'stats', starts for 'one' (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=None, help="per-instance time limit in seconds for 'all'")
+    parser.add_argument("--pattern", default="*.dat", help="glob filter on instance file names for 'all' and 'stats'")
+    parser.add_argument("--family", action="append", choices=INSTANCE_FAMILIES, help="instance family filter for 'all' and 'stats' (repeatable)")
+    parser.add_argument("--output", default=DEFAULT_STATS_OUTPUT, help=f"stats table for 'stats', .csv or .parquet (default: {DEFAULT_STATS_OUTPUT})")
+    parser.add_argument("--betweenness-samples", type=int, default=None, help="sampled sources for betweenness centrality in 'stats' (default: exact)")
+    parser.add_argument("--solutions-dir", default=SOLUTIONS_FOLDER, help=f"folder for the sol-*.dat files, written or validated (default: {SOLUTIONS_FOLDER})")
+    parser.add_argument("--combined-output", default=None, help="write every solution of 'all' into this single JSON Lines file instead of one file each")
+    parser.add_argument("--no-bound", action="store_true", help="skip the lower bound and gap report in 'all'")
+    parser.add_argument("--instrument", action="store_true", help="write per-phase timings and call counts as JSON per instance")
+    parser.add_argument("--profile", action="store_true", help="add a cProfile summary to the instrumentation report (implies --instrument)")
+    parser.add_argument("--trace-memory", action="store_true", help="add a tracemalloc summary to the instrumentation report (implies --instrument)")
+    parser.add_argument("--instrument-dir", default=DEFAULT_INSTRUMENTATION_FOLDER, help=f"folder for instrumentation reports (default: {DEFAULT_INSTRUMENTATION_FOLDER})")
+    args = parser.parse_args()
+
+    if args.betweenness_samples is not None and args.betweenness_samples < 1:
+        parser.error("--betweenness-samples must be at least 1")
+
+    if args.starts > 1 and (args.solver != "constructive" or args.local_search or args.metaheuristic):
+        parser.error("--starts only applies to the constructive solver without an improvement phase")
+
+    solver_options = {
+        "solver": args.solver,
+        "local_search": args.local_search,
+        "time_limit": args.time_limit,
+        "metaheuristic": args.metaheuristic,
+        "seed": args.seed,
+        "max_iterations": args.max_iterations,
+        "starts": args.starts,
+    }
+
+    instrumentation = None
+    if args.instrument or args.profile or args.trace_memory:
+        instrumentation = {"profile": args.profile, "trace_memory": args.trace_memory, "folder": args.instrument_dir}
+
+    start_total = perf_counter()
+
+    solution_method = args.mode or input("Select solution method. To generate solution for all data or one file: (all/one)")
+
+    if solution_method == "one":
+        filepath = args.filename or input("Type the filename: ")
+
+        with get_instrumentation_context(filepath, instrumentation) as instrument:
+            graph, _ = read_dat_to_graph(filepath)
+
+            on_improvement = make_incumbent_exporter(filepath, start_total, args.solutions_dir)
+
+            routes, total_cost, clocks_used  = solve_graph(graph, on_improvement=on_improvement, start_workers=args.workers, **solver_options)
+
+            end_total = perf_counter()
+
+            total_clocks = int((end_total - start_total) * 1e6)
+
+            export_solution_to_dat(filepath, routes, total_cost, total_clocks, clocks_used, args.solutions_dir)
+
+        if instrument is not None:
+            print(f"Instrumentation report: {save_instrumentation_report(instrument, instrumentation)}")
+    elif solution_method == "stats":
+        if args.output.endswith(".parquet") and not has_parquet_engine():
+            parser.error("--output .parquet needs pyarrow or fastparquet installed; use a .csv output instead")
+
+        filenames = list_dat_files(args.pattern, args.family, order="largest_first")
+        rows = []
+
+        for row in run_stats_batch(filenames, workers=args.workers, betweenness_samples=args.betweenness_samples):
+            rows.append(row)
+            print(f"{row['instance']}: {row['status']} {row.get('error', '')}".rstrip())
+
+        write_stats_table(rows, args.output)
+    elif solution_method == "validate":
+        filepaths = [
+            filepath for filepath in list_solution_files(args.solutions_dir)
+            if fnmatch.fnmatch(filepath, f"*sol-{args.pattern}") and (not args.family or os.path.basename(filepath)[4:].startswith(tuple(args.family)))
+        ]
+        failures = 0
+
+        for result in run_validation(filepaths, workers=args.workers):
+            if result["status"] != "valid":
+                failures += 1
+                print(f"{result['instance']}: {result['status']}")
+                for error in result["errors"]:
+                    print(f"    {error}")
+
+        print(f"{len(filepaths)} solutions checked, {failures} failed")
+        sys.exit(1 if failures else 0)
+    else:
+        filenames = list_dat_files(args.pattern, args.family, order="largest_first")
+
+        combined = args.combined_output is not None
+        solutions = []
+
+        for summary in run_batch(filenames, workers=args.workers, timeout=args.timeout, instrumentation=instrumentation,
+                                 output_folder=None if combined else args.solutions_dir, keep_solution=combined,
+                                 report_bound=not args.no_bound, **solver_options):
+            if summary["status"] == "ok":
+                if combined:
+                    solutions.append(summary)
+                line = f"{summary['instance']}: cost {summary['total_cost']}, {summary['routes']} routes, {summary['total_clocks']} clocks"
+                if summary.get("gap") is not None:
+                    line += f", lower bound {summary['lower_bound']} (gap {summary['gap']:.1%})"
+                if summary.get("optimal_value") is not None:
+                    line += f", header optimal value {summary['optimal_value']}"
+                print(line)
+            else:
+                print(f"{summary['instance']}: {summary['status']} {summary.get('error', '')}".rstrip())
+
+        if combined:
+            write_combined_solutions(sorted(solutions, key=lambda summary: summary["instance"]), args.combined_output)
+
+
+if __name__ == "__main__":
+    main()